@@ -37,9 +37,14 @@ from jinja2 import (
     TemplateNotFound,
 )
 
+from .backends import BACKENDS, get_pandoc_backend
 from .config import Config
+from .conversion import finish_conversions, json_default
 from .formatters import alphanum_key
+from .httpcache import CACHE_MODES
+from .recording import start_recording
 from .spec import build_spec_model
+from .stats import get_stats, report_path
 from .tplan import build_tpr_model, render_report
 from .vcd import build_vcd_dict, summary
 from .ve_baseline import do_ve_model
@@ -100,15 +105,87 @@ if "JIRA_PASSWORD" in os.environ:
     envvar="JIRA_PASSWORD",
     help="Jira cloud  password - usually an API token  ",
 )
+@click.option(
+    "--cache-dir",
+    default=Config.CACHE_DIR,
+    envvar="DOCSTEADY_CACHE_DIR",
+    help="Directory for the caches kept between runs. "
+    f'Defaults to "{Config.CACHE_DIR}".',
+)
+@click.option(
+    "--cache-mode",
+    default="use",
+    type=click.Choice(CACHE_MODES),
+    help="How to use the Jira and Zephyr responses kept between runs: "
+    "while they are fresh (use, the default), only after asking the "
+    "server whether they changed (refresh) or without contacting the "
+    "server (offline).",
+)
+@click.option(
+    "--record",
+    type=click.Path(dir_okay=False),
+    help="Save every exchange with Jira, Zephyr and the image hosts to "
+    "this archive.",
+)
+@click.option(
+    "--replay",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Answer every request from an archive saved with --record, "
+    "without contacting any server.",
+)
+@click.option(
+    "--stats",
+    is_flag=True,
+    default=False,
+    help="Print the requests and pandoc calls by endpoint at the end and "
+    "write them as JSON next to the output.",
+)
+@click.option(
+    "--lazy-conversion",
+    is_flag=True,
+    default=False,
+    help="Only convert fields with pandoc when a template renders them.",
+)
+@click.option(
+    "--jobs",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Number of pandoc conversions to run in parallel.",
+)
+@click.option(
+    "--concurrency",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Number of Verification Elements to extract from Jira and Zephyr "
+    "at the same time.",
+)
+@click.option(
+    "--pandoc-backend",
+    default="batched",
+    type=click.Choice(list(BACKENDS)),
+    help="How to run pandoc: one process per list of fields (batched), "
+    "one process per field (subprocess) or a local pandoc server (server).",
+)
 @click.version_option(__version__)
 @click.version_option(__version__)
+@click.pass_context
 def cli(
+    ctx: click.Context,
     namespace: str,
     template_format: str,
     load_from: str,
     token: str,
     username: str,
     password: str,
+    cache_dir: str,
+    cache_mode: str,
+    record: str | None,
+    replay: str | None,
+    stats: bool,
+    lazy_conversion: bool,
+    jobs: int,
+    concurrency: int,
+    pandoc_backend: str,
 ) -> None:
     """Docsteady generates documents from Jira with the
     Test Management for Jira (TM4J) plugin.
@@ -119,6 +196,30 @@ def cli(
     Config.TEMPLATE_DIRECTORY = load_from
     Config.ZEPHYR_TOKEN = token
     Config.AUTH = (username, password)
+    Config.CACHE_DIR = cache_dir
+    Config.HTTP_CACHE_MODE = cache_mode
+    if record and replay:
+        raise click.UsageError("--record and --replay are exclusive")
+    archive = record or replay
+    if archive:
+        start_recording(archive, replay=bool(replay))
+    Config.STATS = stats
+    if stats:
+        ctx.call_on_close(_report_stats)
+    Config.LAZY_CONVERSION = lazy_conversion
+    Config.JOBS = jobs
+    Config.CONCURRENCY = concurrency
+    Config.HTTP_POOL_SIZE = max(Config.HTTP_POOL_SIZE, concurrency)
+    Config.PANDOC_BACKEND = pandoc_backend
+    if pandoc_backend == "server":
+        get_pandoc_backend()
+
+
+def _report_stats() -> None:
+    stats = get_stats()
+    if stats:
+        click.echo(stats.table(), err=True)
+        stats.write(Config.STATS_REPORT_PATH)
 
 
 @cli.command("generate-spec")
@@ -147,12 +248,14 @@ def generate_spec(
     OUTPUT_FORMAT = format
     Config.AUTH = (username, password)
     target = "spec"
+    Config.STATS_REPORT_PATH = report_path(path)
     # Commented this line out since it seems to never be used.
     # Config.output = TemporaryFile(mode="r+")
 
     # Build model
     try:
         testcases, requirements, tcs_dict = build_spec_model(folder)
+        finish_conversions()
     except Exception as e:
         print("Error in building model")
         print(e)
@@ -264,6 +367,7 @@ def generate_report(
     OUTPUT_FORMAT = format
     Config.INCLUDE_ALL_EXECS = includeall
     target = "tpr"
+    Config.STATS_REPORT_PATH = report_path(path)
 
     if Config.NAMESPACE.upper() not in Config.COMPONENTS.keys():
         print(f"Wrong input component {Config.NAMESPACE}")
@@ -273,6 +377,7 @@ def generate_report(
     # Config.output = TemporaryFile(mode="r+")
 
     plan_dict = build_tpr_model(plan)
+    finish_conversions()
 
     metadata = _metadata()
     metadata["namespace"] = Config.NAMESPACE
@@ -367,9 +472,31 @@ def _metadata() -> dict:
     help="If true, dump json before rendering tex, "
     "if the file exists use it next time instead of hitting server",
 )
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Only extract the Verification Elements updated since the last "
+    "incremental run, and the test cases edited or executed since. Test "
+    "steps and executions edited or deleted since are only seen by the "
+    "full extraction done when the last one is a week old.",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help="Reuse the Verification Elements extracted by an interrupted "
+    "run instead of extracting them again.",
+)
 @click.argument("path", required=False, type=click.Path())
 def generate_vcd(
-    format: str, spec: str, subcomponent: str, path: str, dump: bool
+    format: str,
+    spec: str,
+    subcomponent: str,
+    path: str,
+    dump: bool,
+    incremental: bool,
+    resume: bool,
 ) -> None:
     """Given a specific namespace, correspoding to a Jira Component
     or Rubin Subsystem, it build the VCD. By default build the DM VCD.
@@ -378,6 +505,7 @@ def generate_vcd(
     global OUTPUT_FORMAT
     OUTPUT_FORMAT = format
     target = "vcd"
+    Config.STATS_REPORT_PATH = report_path(path)
 
     component = Config.NAMESPACE.upper()
 
@@ -389,7 +517,10 @@ def generate_vcd(
         with open("ve_model.json", "r") as fp:
             ve_model = json.load(fp)
     else:
-        ve_model = do_ve_model(component, subcomponent)
+        ve_model = do_ve_model(
+            component, subcomponent, incremental=incremental, resume=resume
+        )
+        finish_conversions()
     vcd_dict = build_vcd_dict(ve_model, usedump=dump)
     sum_dict: list[dict | Any] = summary(vcd_dict)
 
@@ -456,6 +587,22 @@ if __name__ == "__main__":
     help="If true, dump json before rendering tex, "
     "if the file exists use it next time instead of hitting server",
 )
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Only extract the Verification Elements updated since the last "
+    "incremental run, and the test cases edited or executed since. Test "
+    "steps and executions edited or deleted since are only seen by the "
+    "full extraction done when the last one is a week old.",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help="Reuse the Verification Elements extracted by an interrupted "
+    "run instead of extracting them again.",
+)
 @click.argument("path", required=False, type=click.Path())
 def baseline_ve(
     format: str,
@@ -463,6 +610,8 @@ def baseline_ve(
     dump: bool,
     subcomponent: str,
     path: str,
+    incremental: bool,
+    resume: bool,
 ) -> None:
     """Given a specific subsystem (component), and subcomponent,
     a document is generated including all corresponding Verification Elements
@@ -472,6 +621,7 @@ def baseline_ve(
     global OUTPUT_FORMAT
     OUTPUT_FORMAT = format
     target = "ve"
+    Config.STATS_REPORT_PATH = report_path(path)
     jfile = f"baseline_{target}.json"
 
     component = Config.NAMESPACE.upper()
@@ -485,9 +635,12 @@ def baseline_ve(
         with open(jfile, "r") as fp:
             ve_model = json.load(fp)
     else:
-        ve_model = do_ve_model(component, subcomponent)
+        ve_model = do_ve_model(
+            component, subcomponent, incremental=incremental, resume=resume
+        )
+        finish_conversions()
         with open(jfile, "w") as f:
-            json.dump(ve_model, f)
+            json.dump(ve_model, f, default=json_default)
 
     file = open(path, "w") if path else sys.stdout
 
@@ -0,0 +1,242 @@
+# LSST Data Management System
+# Copyright 2018 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+The ways of running pandoc on a list of fragments
+"""
+import abc
+import atexit
+import logging
+import os
+import re
+import socket
+import subprocess
+import threading
+import time
+from typing import List
+
+import pypandoc
+import requests
+
+from .config import Config
+
+# Fragments are separated by a paragraph holding a bold marker. The bold
+# markup is what tells a real separator apart from the same text quoted
+# inside a verbatim block of an unbalanced fragment.
+SPLIT_MARKER = "DOCSTEADYFRAGMENTSPLIT"
+SPLIT_MARKUP = {
+    "html": "\n<p><strong>" + SPLIT_MARKER + "{index}</strong></p>\n",
+    "gfm": "\n\n**" + SPLIT_MARKER + "{index}**\n\n",
+}
+SPLIT_PATTERN = re.compile(
+    r"^(?:<p>)?(?:\\textbf\{|<strong>)"
+    + SPLIT_MARKER
+    + r"(\d+)(?:\}|</strong>)(?:</p>)?$\n?",
+    re.MULTILINE,
+)
+
+# Fragments pandoc would not convert the same next to others: headings,
+# whose identifiers are made unique across the document, other ids, and
+# markdown link reference and footnote definitions, which apply to the
+# whole document. They are converted on their own.
+ISOLATED_PATTERN = {
+    "html": re.compile(r"<h[1-6]\b|\sid\s*=", re.IGNORECASE),
+    "gfm": re.compile(
+        r"^ {0,3}(?:#{1,6}(?:[ \t]|$)|=+[ \t]*$|-+[ \t]*$|\[[^\]]+\]:)",
+        re.MULTILINE,
+    ),
+}
+
+
+class PandocBackend(abc.ABC):
+    """Converts fragments of one input format with pandoc."""
+
+    @abc.abstractmethod
+    def convert(
+        self, texts: List[str], source_format: str, to: str
+    ) -> List[str]:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class SubprocessBackend(PandocBackend):
+    """One pandoc process per fragment."""
+
+    def convert(
+        self, texts: List[str], source_format: str, to: str
+    ) -> List[str]:
+        return [
+            pypandoc.convert_text(text, to, format=source_format)
+            for text in texts
+        ]
+
+
+class BatchedBackend(SubprocessBackend):
+    """One pandoc process for all the fragments, joined with separators.
+    If the separators do not survive (a fragment swallowed one) the list is
+    split in two and each half is tried again. Fragments matching
+    ``ISOLATED_PATTERN`` are converted on their own.
+    """
+
+    def convert(
+        self, texts: List[str], source_format: str, to: str
+    ) -> List[str]:
+        if len(texts) <= 1 or source_format not in SPLIT_MARKUP:
+            return super().convert(texts, source_format, to)
+        isolated = ISOLATED_PATTERN[source_format]
+        alone = [i for i, text in enumerate(texts) if isolated.search(text)]
+        if alone:
+            outputs = super().convert(
+                [texts[i] for i in alone], source_format, to
+            )
+            batched = sorted(set(range(len(texts))) - set(alone))
+            outputs += self.convert(
+                [texts[i] for i in batched], source_format, to
+            )
+            by_index = dict(zip(alone + batched, outputs))
+            return [by_index[i] for i in range(len(texts))]
+        markup = SPLIT_MARKUP[source_format]
+        joined = "".join(
+            text + markup.format(index=index)
+            for index, text in enumerate(texts)
+        )
+        output = pypandoc.convert_text(joined, to, format=source_format)
+        indices = [int(i) for i in SPLIT_PATTERN.findall(output)]
+        if indices == list(range(len(texts))):
+            parts = SPLIT_PATTERN.split(output)
+            # split() interleaves the captured indices with the text
+            return [part.strip("\n") + "\n" for part in parts[0:-1:2]]
+        middle = len(texts) // 2
+        return self.convert(texts[:middle], source_format, to) + self.convert(
+            texts[middle:], source_format, to
+        )
+
+
+class ServerBackend(PandocBackend):
+    """A ``pandoc server`` on localhost, sent all the fragments in one
+    request over a kept alive connection."""
+
+    def __init__(self, url: str, process: subprocess.Popen | None = None):
+        self.url = url
+        self.process = process
+        self._pid = os.getpid()
+        self._session = requests.Session()
+
+    @classmethod
+    def start(cls, timeout: int = 60) -> "ServerBackend":
+        """Start a server on a free port and wait until it answers."""
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        process = subprocess.Popen(
+            [
+                pypandoc.get_pandoc_path(),
+                "server",
+                f"--port={port}",
+                f"--timeout={timeout}",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        backend = cls(f"http://127.0.0.1:{port}", process)
+        deadline = time.monotonic() + 10
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(
+                    f"pandoc server exited with code {process.returncode}"
+                )
+            try:
+                backend.session.get(f"{backend.url}/version", timeout=1)
+                return backend
+            except requests.ConnectionError:
+                if time.monotonic() > deadline:
+                    backend.close()
+                    raise RuntimeError("pandoc server did not start")
+                time.sleep(0.05)
+
+    @property
+    def session(self) -> requests.Session:
+        # pool workers must not share the socket of the parent process
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._session = requests.Session()
+            self.process = None
+        return self._session
+
+    def convert(
+        self, texts: List[str], source_format: str, to: str
+    ) -> List[str]:
+        if not texts:
+            return []
+        response = self.session.post(
+            f"{self.url}/batch",
+            json=[
+                {"text": text, "from": source_format, "to": to}
+                for text in texts
+            ],
+            headers={"Accept": "application/json"},
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"pandoc server: {response.text}")
+        # the command line ends its output with a newline, the server not
+        return [
+            result["output"].rstrip("\n") + "\n" for result in response.json()
+        ]
+
+    def close(self) -> None:
+        self.session.close()
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait()
+            self.process = None
+
+
+_LOCK = threading.Lock()
+
+BACKENDS = {
+    "batched": BatchedBackend,
+    "subprocess": SubprocessBackend,
+    "server": ServerBackend,
+}
+
+
+def get_pandoc_backend() -> PandocBackend:
+    """The backend chosen with ``Config.PANDOC_BACKEND``, created on first
+    use. A server that does not start falls back to batched conversion."""
+    with _LOCK:
+        if Config.THE_PANDOC_BACKEND is None:
+            Config.THE_PANDOC_BACKEND = _start_pandoc_backend()
+    return Config.THE_PANDOC_BACKEND
+
+
+def _start_pandoc_backend() -> PandocBackend:
+    backend: PandocBackend
+    if Config.PANDOC_BACKEND == "server":
+        try:
+            backend = ServerBackend.start()
+        except (OSError, RuntimeError) as e:
+            logging.log(logging.WARN, f"Using batched conversion instead: {e}")
+            backend = BatchedBackend()
+    else:
+        backend = BACKENDS[Config.PANDOC_BACKEND]()
+    atexit.register(backend.close)
+    return backend
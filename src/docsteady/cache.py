@@ -0,0 +1,104 @@
+# LSST Data Management System
+# Copyright 2018 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+The in memory caches of the objects loaded from Jira and Zephyr
+"""
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, MutableMapping
+
+
+class Cache(dict):
+    """A dict filled with `fetch`: threads asking for a key being loaded
+    wait for that load instead of repeating it. With ``max_entries`` the
+    entries fetched least recently are dropped. Hits, misses and waits are
+    counted in ``stats``. A load returning None is not kept.
+    """
+
+    def __init__(self, name: str, max_entries: int | None = None):
+        super().__init__()
+        self.name = name
+        self.max_entries = max_entries
+        self.stats: Counter = Counter()
+        self.lock = threading.RLock()
+        self.loading: dict[Hashable, tuple[Future, int]] = {}
+
+    def fetch(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """The value of ``key``, from ``load()`` on the first call."""
+        me = threading.get_ident()
+        with self.lock:
+            if key in self:
+                self.stats["hit"] += 1
+                value = self[key]
+                if self.max_entries:
+                    # most recently used last
+                    super().__delitem__(key)
+                    super().__setitem__(key, value)
+                return value
+            future, owner = self.loading.get(key, (None, me))
+            if future is None:
+                self.stats["miss"] += 1
+                future = Future()
+                self.loading[key] = (future, me)
+            elif owner == me:
+                # the load of this key needs the same key again
+                future = None
+            else:
+                self.stats["wait"] += 1
+        if future is None:
+            return load()
+        if owner != me:
+            return future.result()
+        try:
+            value = load()
+        except BaseException as e:
+            with self.lock:
+                del self.loading[key]
+            future.set_exception(e)
+            raise
+        with self.lock:
+            if value is not None:
+                self[key] = value
+            del self.loading[key]
+        future.set_result(value)
+        return value
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        with self.lock:
+            super().__setitem__(key, value)
+            while self.max_entries and len(self) > self.max_entries:
+                super().__delitem__(next(iter(self)))
+
+
+def fetch(
+    cache: MutableMapping, key: Hashable, load: Callable[[], Any]
+) -> Any:
+    """`Cache.fetch` for any mapping. A plain dict, set by a test or read
+    from a dump, is filled without waiting for other threads."""
+    if isinstance(cache, Cache):
+        return cache.fetch(key, load)
+    if key in cache:
+        return cache[key]
+    value = load()
+    if value is not None:
+        cache[key] = value
+    return value
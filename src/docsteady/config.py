@@ -23,13 +23,24 @@ from __future__ import annotations
 import os
 import re
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from typing import TYPE_CHECKING, Any
 
 from requests import Session
 from zephyr import ZephyrScale
 
+from .cache import Cache
+
 if TYPE_CHECKING:
+    from .backends import PandocBackend
+    from .conversion import ConversionCache
+    from .executions import ExecutionIndex
+    from .httpcache import HttpCache
+    from .recording import Recording
+    from .scheduler import HostLimiter
     from .spec import Issue
+    from .stats import RunStats
+    from .users import UserDirectory
 
 
 class Config:
@@ -42,13 +53,58 @@ class Config:
     INCLUDE_ALL_EXECS: bool = False
     THE_SESSION: Session | None = None
     THE_ZEPHYR: ZephyrScale = None
+    THE_IMAGE_SESSION: Session | None = None
+    THE_HTTP_SESSION: Session | None = None
+    # connections kept alive per host and retries of failed requests
+    HTTP_POOL_SIZE: int = 10
+    HTTP_RETRIES: int = 3
+    HTTP_BACKOFF: float = 0.5  # seconds before the first retry
+    HTTP_MAX_RETRY_AFTER: float = 120  # longest pause a server may ask
+    # requests per second and burst allowed to each host, the number in
+    # flight adapts to the 429 and 5xx answers, see scheduler.HostLimiter
+    HTTP_RATE_LIMIT: float = 20
+    HTTP_RATE_LIMITS: dict[str, float] = {}  # by host name
+    HTTP_BURST: float = 10
+    THE_LIMITERS: dict[str, HostLimiter] = {}
+    # GET responses kept between runs, see httpcache.CACHE_MODES. In use
+    # mode, the default, a response is used for HTTP_CACHE_TTL seconds, or
+    # the time of the first part of HTTP_CACHE_TTLS found in its URL, then
+    # revalidated
+    HTTP_CACHE_MODE: str = "use"
+    HTTP_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    HTTP_CACHE_TTL: float = 600
+    HTTP_CACHE_TTLS: dict[str, float] = {
+        "/statuses": 24 * 3600,
+        "/priorities": 24 * 3600,
+        "/environments": 24 * 3600,
+        "/projects": 24 * 3600,
+        "/folders": 3600,
+        "/user/bulk": 24 * 3600,
+        "/people/": 24 * 3600,
+    }
+    HTTP_CACHE_STATS: Counter = Counter()  # hit, miss and revalidated
+    THE_HTTP_CACHE: HttpCache | None = None
+    # requests and pandoc calls counted and timed by endpoint, reported
+    # to STATS_REPORT_PATH at the end of the run
+    STATS: bool = False
+    STATS_REPORT_PATH: str = "docsteady-stats.json"
+    THE_STATS: RunStats | None = None
+    # every exchange of the run recorded to or replayed from an archive
+    THE_RECORDING: Recording | None = None
+    # Verification Elements extracted at the same time
+    CONCURRENCY: int = 1
     ZEPHYR_TOKEN = "set in env or with --token"
     JIRA_INSTANCE = "https://rubinobs.atlassian.net"
     JIRA_API = f"{JIRA_INSTANCE}/rest/api/3/"
     ATM_API = f"https://api.zephyrscale.smartbear.com/v2/"
     ISSUE_URL = f"{JIRA_API}/issue/{{issue}}?&expand=renderedFields"
     ISSUE_UI_URL = f"{JIRA_INSTANCE}/browse/{{issue}}"
+    ISSUE_SEARCH_URL = f"{JIRA_API}search"
+    # issues asked for in one search, Jira returns at most 100 per page
+    ISSUE_BATCH_SIZE = 100
     USER_URL = f"{JIRA_API}/people/{{accountId}}"
+    USER_BULK_URL = f"{JIRA_API}user/bulk"
+    USER_BATCH_SIZE = 100
     TESTCASE_UI_URL = f"{JIRA_INSTANCE}/projects/LVV?selectedItem=com.atlassian.plugins.atlassian-connect-plugin:com.kanoah.test-manager__main-project-page#!/v2/testCase/{{testcase}}"
     TESTCASE_SEARCH_URL = f"{ATM_API}/testcase/search"
     # providing an ordered list of statuses we can control for user args
@@ -69,11 +125,27 @@ class Config:
         f"customfield_12206,customfield_13703&"
         f"maxResults={{maxR}}"
     )
+    # fields VerificationE reads, fetched with the search for the VEs
+    VE_FIELDS = (
+        "summary,assignee,description,status,priority,issuelinks,"
+        "customfield_10395,customfield_10396,customfield_10080,"
+        "customfield_10166,customfield_10101,customfield_10076"
+    )
+    VE_PAGE_SIZE = 100
+    # an incremental extraction starts from the last one unless the last
+    # full extraction is older than this, and asks for the VEs updated a
+    # margin before it: JQL dates are in the time zone of the Jira user.
+    # Zephyr gives no update time for test steps and executions, their
+    # edits and deletions are only seen by the full extraction
+    VE_SNAPSHOT_MAX_AGE: float = 7 * 24 * 3600
+    VE_REFRESH_MARGIN: float = 24 * 3600
+    # journal each VE extracted, a failed extraction resumes from it
+    VE_CHECKPOINT: bool = True
     VE_COMPONENT_URL = (
         f"{JIRA_API}/search?jql=project%20%3D%20LVV%20and%20component%20%3D%"
         f"20%22{{cmpnt}}"
         f"%22%20%20and%20issuetype%20%3D%20Verification%20ORDER%20BY"
-        f"%20key%20ASC&fields=key"
+        f"%20key%20ASC&fields={VE_FIELDS}&expand=renderedFields"
         f"&maxResults={{maxR}}&startAt={{startAt}}"
     )
     VE_SUBCMP_URL = (
@@ -81,16 +153,16 @@ class Config:
         f"%20%3D%20%22{{cmpnt}}"
         f"%22%20%20and%20Sub-Component%20%20%3D%20%27{{subcmp}}%27%20and"
         f"%20issuetype%20%3D%2"
-        f"0Verification%20ORDER%20BY%20key%20ASC&fields=key&maxResults="
-        f"{{maxR}}"
+        f"0Verification%20ORDER%20BY%20key%20ASC&fields={VE_FIELDS}"
+        f"&expand=renderedFields&maxResults={{maxR}}"
         f"&startAt={{startAt}}"
     )
     VE_NULLSUBCMP_URL = (
         f"{JIRA_API}/search?jql=project%20%3D%20LVV%20and%20component%"
         f"20%3D%20%22{{cmpnt}}"
         f"%22%20%20AND%20Sub-Component%20is%20null%20and%20issuetype%20%3D%2"
-        f"0Verification%20ORDER%20BY%20key%20ASC&fields=key&maxResults="
-        f"{{maxR}}"
+        f"0Verification%20ORDER%20BY%20key%20ASC&fields={VE_FIELDS}"
+        f"&expand=renderedFields&maxResults={{maxR}}"
         f"&startAt={{startAt}}"
     )
     PANDOC_TYPE: None = None
@@ -98,17 +170,30 @@ class Config:
     REQID_FIELD = "customfield_12001"
     HIGH_LEVEL_REQS_FIELD = "customfield_13515"
     OUTPUT_FORMAT: Any = None
-    CACHED_TESTCASES: dict = {}
-    CACHED_LIBTESTCASES: dict = {}
-    CACHED_USERS: dict[str, dict] = {}
-    CACHED_TESTRES_SUM: dict = {}
-    CACHED_VELEMENTS: dict[str, Issue] = {}  # type : Dict[str, Issue]
-    CACHED_REQS_FOR_VES: dict = {}
-    CACHED_ISSUES: dict[str, Issue] = {}  # type : Dict[str, Issue]
-    CACHED_POINTERS: dict = {}  # URL and value
-    CACHED_TEST_EXECUTIONS: dict = (
-        {}
-    )  # all the execution probalby since i cna not get one from a cycle ..
+    # filled with cache.fetch, tests and dumps may set plain dicts
+    CACHED_TESTCASES: dict = Cache("testcases")
+    CACHED_LIBTESTCASES: dict = Cache("libtestcases")
+    CACHED_USERS: dict[str, dict] = Cache("users")
+    CACHED_TESTRES_SUM: dict = Cache("testres_sum")
+    CACHED_VE_TESTCASES: dict[str, list[str]] = Cache("ve_testcases")
+    # key and test plans of the cycles of the last results, by cycle id
+    CACHED_CYCLES: dict[str, dict] = Cache("cycles")
+    CACHED_PLAN_DOCUMENTS: dict[str, str] = Cache("plan_documents")
+    CACHED_VELEMENTS: dict[str, Issue] = Cache("velements")
+    CACHED_REQS_FOR_VES: dict = Cache("reqs_for_ves")
+    # components and sub-component fields of issues verifying VEs
+    CACHED_COMPONENTS: dict[str, dict] = Cache("components")
+    CACHED_ISSUES: dict[str, Issue] = Cache("issues")
+    CACHED_POINTERS: dict = Cache("pointers")  # URL and value
+    # load the Zephyr statuses, priorities, folders ... before following
+    # pointers to them
+    WARM_POINTERS: bool = True
+    POINTERS_WARMED: bool = False
+    # all the execution probalby since i cna not get one from a cycle ..
+    CACHED_TEST_EXECUTIONS: dict = Cache("test_executions")
+    # all the executions of the project when extracting the VE model, see
+    # executions.load_execution_index
+    THE_EXECUTION_INDEX: ExecutionIndex | None = None
     MODE_PREFIX: Any = None
     NAMESPACE: Any = None
     TIMEZONE = "US/Pacific"
@@ -116,6 +201,29 @@ class Config:
     ISSUES_TO_TESTRESULTS: dict = {}
     TEMPLATE_LANGUAGE: str = "latex"
     TEMPLATE_DIRECTORY: str = os.curdir
+    CACHE_DIR: str = os.environ.get(
+        "DOCSTEADY_CACHE_DIR",
+        os.path.join(
+            os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+            "docsteady",
+        ),
+    )
+    # display names of users are kept between runs for a week
+    USER_CACHE: bool = True
+    USER_CACHE_TTL: float = 7 * 24 * 3600
+    THE_USER_DIRECTORY: UserDirectory | None = None
+    # pandoc output of unchanged fields is reused between runs
+    CONVERSION_CACHE: bool = True
+    CONVERSION_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    THE_CONVERSION_CACHE: ConversionCache | None = None
+    # convert fields only when the template renders them
+    LAZY_CONVERSION: bool = False
+    # number of pandoc processes converting in parallel
+    JOBS: int = 1
+    THE_CONVERSION_EXECUTOR: ProcessPoolExecutor | None = None
+    # batched, subprocess or server, see backends.BACKENDS
+    PANDOC_BACKEND = "batched"
+    THE_PANDOC_BACKEND: PandocBackend | None = None
 
     # Regexes for LSST things
     DOC_NAMES = ["LDM", "LSE", "DMTN", "DMTR", "TSS", "LPM", "LTS"]
@@ -0,0 +1,509 @@
+# LSST Data Management System
+# Copyright 2018 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Batched pandoc conversion of the HTML and markdown fragments in a model
+"""
+import hashlib
+import itertools
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator, List
+
+import pypandoc
+from marshmallow import Schema
+
+from .backends import ServerBackend, get_pandoc_backend
+from .config import Config
+from .simplehtml import html_to_latex
+from .stats import get_stats
+
+# Smallest number of fragments worth handing to a pool worker
+MIN_CHUNK = 25
+
+
+class PendingConversion:
+    """A fragment waiting to be converted, either by the batch it belongs
+    to or, for lazy conversion, the first time it is used.
+    ``finish`` is the field specific post processing of pandoc's output.
+
+    Once converted it behaves like the resulting string so templates and
+    code reading the model do not need to know about it.
+    """
+
+    def __init__(
+        self,
+        text: str,
+        source_format: str,
+        finish: Callable[[str], str],
+        group: str = "",
+    ):
+        self.text = text
+        self.source_format = source_format
+        self.finish = finish
+        self.group = group
+        self._value: str | None = None
+        self._chunk: _Chunk | None = None
+
+    @property
+    def value(self) -> str:
+        if self._value is None and self._chunk is not None:
+            self._chunk.resolve()
+        if self._value is None:
+            resolve_group(self.group, self)
+        assert self._value is not None
+        return self._value
+
+    @value.setter
+    def value(self, value: str) -> None:
+        self._value = value
+
+    def __getattr__(self, name: str) -> Any:
+        # str methods such as strip() or replace()
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.value, name)
+
+    def __str__(self) -> str:
+        return self.value
+
+    def __repr__(self) -> str:
+        return repr(self.value)
+
+    def __format__(self, spec: str) -> str:
+        return format(self.value, spec)
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    def __bool__(self) -> bool:
+        return bool(self.value)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.value)
+
+    def __contains__(self, item: str) -> bool:
+        return item in self.value
+
+    def __getitem__(self, index: Any) -> str:
+        return self.value[index]
+
+    def __eq__(self, other: object) -> bool:
+        return self.value == other
+
+    def __lt__(self, other: str) -> bool:
+        return self.value < other
+
+    def __hash__(self) -> int:
+        return hash(self.value)
+
+    def __add__(self, other: str) -> str:
+        return self.value + other
+
+    def __radd__(self, other: str) -> str:
+        return other + self.value
+
+
+class ConversionBatch:
+    """Collects the fragments of one (possibly nested) schema load and
+    converts them with one pandoc call per input format.
+    """
+
+    def __init__(self) -> None:
+        self.pending: List[PendingConversion] = []
+        self.results: List[Any] = []
+
+    def add(self, conversion: PendingConversion) -> PendingConversion:
+        self.pending.append(conversion)
+        return conversion
+
+    def track(self, result: Any) -> None:
+        """Remember a loaded object so its pending values can be
+        replaced once the batch is converted."""
+        self.results.append(result)
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        _convert_pending(self.pending, Config.TEMPLATE_LANGUAGE, wait=False)
+        seen: set[int] = set()
+        for result in self.results:
+            _replace_pending(result, seen)
+        if any(c._value is None for c in self.pending):
+            # still in the pool, see finish_conversions()
+            _UNPATCHED.extend(self.results)
+        self.pending = []
+        self.results = []
+
+
+class _Chunk:
+    """Fragments of one format handed to one pandoc call, possibly running
+    in a worker of the conversion pool."""
+
+    def __init__(
+        self,
+        conversions: List[PendingConversion],
+        keys: List[str],
+        future: Future,
+    ):
+        self.conversions = conversions
+        self.keys = keys
+        self.future: Future | None = future
+        for conversion in conversions:
+            conversion._chunk = self
+
+    def resolve(self) -> None:
+        if self.future is None:
+            return
+        outputs = self.future.result()
+        self.future = None
+        cache = get_conversion_cache()
+        if cache is not None:
+            cache.put_many(dict(zip(self.keys, outputs)))
+        for conversion, output in zip(self.conversions, outputs):
+            conversion.value = conversion.finish(output)
+            conversion._chunk = None
+
+
+# The batch of each thread, models may be loaded concurrently
+_LOCAL = threading.local()
+_LOCK = threading.Lock()
+
+# Chunks submitted to the pool and the models waiting for them
+_OUTSTANDING: List[_Chunk] = []
+_UNPATCHED: List[Any] = []
+
+# Lazy conversions not used yet, per schema field
+_LAZY_GROUPS: dict[str, List[PendingConversion]] = {}
+
+
+@contextmanager
+def conversion_batch() -> Iterator[ConversionBatch]:
+    """Batch all conversions requested inside the block. Nested blocks
+    join the outermost batch which is converted when it exits."""
+    active = _active_batch()
+    if active is not None:
+        yield active
+        return
+    batch = _LOCAL.batch = ConversionBatch()
+    try:
+        yield batch
+        batch.flush()
+    finally:
+        _LOCAL.batch = None
+
+
+def _active_batch() -> ConversionBatch | None:
+    return getattr(_LOCAL, "batch", None)
+
+
+def convert(
+    text: str,
+    source_format: str,
+    finish: Callable[[str], str],
+    group: str = "",
+) -> str | PendingConversion:
+    """Convert ``text`` to the template language, or return a placeholder
+    for it. With ``Config.LAZY_CONVERSION`` the placeholder is converted
+    when first used, along with every other unused value of the same
+    ``group``. Otherwise it is converted with the active batch.
+    Simple HTML is converted straight away without pandoc.
+    """
+    if source_format == "html" and Config.TEMPLATE_LANGUAGE == "latex":
+        native = html_to_latex(text)
+        if native is not None:
+            return finish(native)
+    if Config.LAZY_CONVERSION:
+        conversion = PendingConversion(text, source_format, finish, group)
+        _LAZY_GROUPS.setdefault(group, []).append(conversion)
+        return conversion
+    active = _active_batch()
+    if active is not None:
+        return active.add(
+            PendingConversion(text, source_format, finish, group)
+        )
+    return finish(
+        convert_texts([text], source_format, Config.TEMPLATE_LANGUAGE)[0]
+    )
+
+
+def resolve_group(group: str, conversion: PendingConversion) -> None:
+    """Convert ``conversion`` together with the rest of its group.
+    A template printing one test case objective is going to print the
+    others too, so they share one pandoc call."""
+    pending = _LAZY_GROUPS.pop(group, [])
+    if not any(c is conversion for c in pending):
+        pending.append(conversion)
+    _convert_pending(pending, Config.TEMPLATE_LANGUAGE)
+
+
+def _convert_pending(
+    pending: List[PendingConversion], to: str, wait: bool = True
+) -> None:
+    """Convert ``pending`` with one pandoc call per input format, or with
+    ``Config.JOBS`` calls in parallel for large batches. Values found in the
+    conversion cache are set straight away. Unless ``wait`` is set, work
+    handed to the pool is left to finish while the caller carries on.
+    """
+    cache = get_conversion_cache()
+    by_format: dict[str, List[PendingConversion]] = {}
+    for conversion in pending:
+        by_format.setdefault(conversion.source_format, []).append(conversion)
+    for source_format, conversions in by_format.items():
+        keys = []
+        if cache is not None:
+            keys = [cache.key(c.text, source_format, to) for c in conversions]
+            found = cache.get_many(keys)
+            for conversion, key in zip(conversions, keys):
+                if key in found:
+                    conversion.value = conversion.finish(found[key])
+        missing = [
+            (conversion, key)
+            for conversion, key in itertools.zip_longest(conversions, keys)
+            if conversion._value is None
+        ]
+        size = max(-(-len(missing) // Config.JOBS), MIN_CHUNK)
+        for start in range(0, len(missing), size):
+            part = missing[start : start + size]
+            texts = [conversion.text for conversion, _ in part]
+            chunk = _Chunk(
+                [conversion for conversion, _ in part],
+                [key for _, key in part if key is not None],
+                _submit(texts, source_format, to),
+            )
+            if wait or Config.JOBS <= 1:
+                chunk.resolve()
+            else:
+                _OUTSTANDING.append(chunk)
+
+
+def _submit(texts: List[str], source_format: str, to: str) -> Future:
+    started = time.perf_counter()
+    future: Future
+    if Config.JOBS > 1:
+        future = get_conversion_executor().submit(
+            convert_fragments, texts, source_format, to
+        )
+    else:
+        future = Future()
+        future.set_result(convert_fragments(texts, source_format, to))
+    stats = get_stats()
+    if stats:
+        future.add_done_callback(
+            lambda f: stats.record(
+                f"pandoc {source_format}",
+                "ok" if f.exception() is None else "error",
+                time.perf_counter() - started,
+                sum(len(text) for text in texts),
+            )
+        )
+    return future
+
+
+def get_conversion_executor() -> ProcessPoolExecutor:
+    """The pool of ``Config.JOBS`` conversion processes. They are started
+    by a fork server, not forked from this process whose other threads
+    may hold locks, and use the pandoc backend of this process."""
+    backend = get_pandoc_backend()
+    url = backend.url if isinstance(backend, ServerBackend) else None
+    with _LOCK:
+        if not Config.THE_CONVERSION_EXECUTOR:
+            methods = multiprocessing.get_all_start_methods()
+            method = "forkserver" if "forkserver" in methods else "spawn"
+            Config.THE_CONVERSION_EXECUTOR = ProcessPoolExecutor(
+                max_workers=Config.JOBS,
+                mp_context=multiprocessing.get_context(method),
+                initializer=_init_worker,
+                initargs=(Config.PANDOC_BACKEND, url),
+            )
+    return Config.THE_CONVERSION_EXECUTOR
+
+
+def _init_worker(pandoc_backend: str, server_url: str | None) -> None:
+    Config.PANDOC_BACKEND = pandoc_backend
+    if server_url:
+        # the server of the parent process, stopped by the parent
+        Config.THE_PANDOC_BACKEND = ServerBackend(server_url)
+
+
+def finish_conversions() -> None:
+    """Wait for the conversions still running in the pool and put their
+    output in the loaded models. Call this before rendering."""
+    while _OUTSTANDING:
+        _OUTSTANDING.pop(0).resolve()
+    seen: set[int] = set()
+    for result in _UNPATCHED:
+        _replace_pending(result, seen)
+    _UNPATCHED.clear()
+
+
+def json_default(obj: Any) -> Any:
+    """``default`` for ``json.dump`` of models holding lazy values."""
+    if isinstance(obj, PendingConversion):
+        return obj.value
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def convert_texts(texts: List[str], source_format: str, to: str) -> List[str]:
+    """Convert ``texts``, only running pandoc on those not in the
+    conversion cache."""
+    conversions = [PendingConversion(t, source_format, str) for t in texts]
+    _convert_pending(conversions, to)
+    return [conversion.value for conversion in conversions]
+
+
+def convert_fragments(
+    texts: List[str], source_format: str, to: str
+) -> List[str]:
+    """Convert ``texts`` with the pandoc backend of ``Config``."""
+    return get_pandoc_backend().convert(texts, source_format, to)
+
+
+def _replace_pending(obj: Any, seen: set[int]) -> None:
+    """Swap converted placeholders in ``obj`` for their plain string.
+    Lazy placeholders not used yet stay in place."""
+    if id(obj) in seen:
+        return
+    seen.add(id(obj))
+    if isinstance(obj, dict):
+        items: Iterable = obj.items()
+    elif isinstance(obj, list):
+        items = enumerate(obj)
+    else:
+        return
+    for key, value in list(items):
+        if isinstance(value, PendingConversion):
+            if value._value is not None:
+                obj[key] = value._value
+        else:
+            _replace_pending(value, seen)
+
+
+class ConversionCache:
+    """On disk cache of pandoc output keyed on a hash of the input, the
+    input and output formats and the pandoc version.
+    Least recently used entries are evicted once the cache grows beyond
+    ``max_bytes``. It may be used from several threads, one at a time.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_bytes = max_bytes
+        self.pandoc_version = pypandoc.get_pandoc_version()
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS conversions ("
+            "key TEXT PRIMARY KEY, output TEXT, size INTEGER, used REAL)"
+        )
+        self.db.commit()
+
+    def key(self, text: str, source_format: str, to: str) -> str:
+        digest = hashlib.sha256()
+        for part in (self.pandoc_version, source_format, to, text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get_many(self, keys: List[str]) -> dict[str, str]:
+        with self.lock:
+            found: dict[str, str] = {}
+            # stay well below the sqlite limit on query parameters
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self.db.execute(
+                    "SELECT key, output FROM conversions "
+                    f"WHERE key IN ({marks})",
+                    chunk,
+                ).fetchall()
+                found.update(rows)
+                self.db.execute(
+                    "UPDATE conversions SET used = ? "
+                    f"WHERE key IN ({marks})",
+                    [time.time(), *chunk],
+                )
+            self.db.commit()
+            return found
+
+    def put_many(self, outputs: dict[str, str]) -> None:
+        with self.lock:
+            now = time.time()
+            self.db.executemany(
+                "INSERT OR REPLACE INTO conversions VALUES (?, ?, ?, ?)",
+                [
+                    (key, output, len(output.encode("utf-8")), now)
+                    for key, output in outputs.items()
+                ],
+            )
+            self.db.commit()
+            self.evict()
+
+    def evict(self) -> None:
+        """Drop the least recently used entries down to 90% of the
+        allowed size."""
+        with self.lock:
+            (total,) = self.db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM conversions"
+            ).fetchone()
+            if total <= self.max_bytes:
+                return
+            excess = total - int(self.max_bytes * 0.9)
+            rows = self.db.execute(
+                "SELECT key, size FROM conversions ORDER BY used"
+            )
+            stale = []
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                stale.append((key,))
+                excess -= size
+            self.db.executemany("DELETE FROM conversions WHERE key = ?", stale)
+            self.db.commit()
+
+
+def get_conversion_cache() -> ConversionCache | None:
+    """The conversion cache under ``Config.CACHE_DIR`` or None if
+    caching is turned off."""
+    if not Config.CONVERSION_CACHE:
+        return None
+    with _LOCK:
+        if not Config.THE_CONVERSION_CACHE:
+            Config.THE_CONVERSION_CACHE = ConversionCache(
+                os.path.join(Config.CACHE_DIR, "conversions.sqlite"),
+                Config.CONVERSION_CACHE_MAX_BYTES,
+            )
+    return Config.THE_CONVERSION_CACHE
+
+
+class BatchedSchema(Schema):
+    """A schema whose pandoc fields, including those of nested schemas,
+    are converted together when the outermost load finishes."""
+
+    def load(self, *args: Any, **kwargs: Any) -> Any:
+        with conversion_batch() as batch:
+            result = super().load(*args, **kwargs)
+            batch.track(result)
+        return result
@@ -23,10 +23,9 @@ Code for Test Report (Run) Model Generation
 """
 from typing import List
 
-import requests
-from marshmallow import EXCLUDE, Schema, fields, post_load, pre_load
+from marshmallow import EXCLUDE, fields, post_load, pre_load
 
-from docsteady.spec import Issue
+from docsteady.spec import Issue, load_issue
 from docsteady.utils import (
     HtmlPandocField,
     MarkdownableHtmlPandocField,
@@ -37,10 +36,12 @@ from docsteady.utils import (
     process_links,
 )
 
+from .cache import fetch
 from .config import Config
+from .conversion import BatchedSchema
 
 
-class ScriptResult(Schema):
+class ScriptResult(BatchedSchema):
     index = fields.Integer(data_key="index")
     id = fields.Integer(data_key="key")
     expected_result = MarkdownableHtmlPandocField(data_key="expectedResult")
@@ -95,22 +96,17 @@ class ScriptResult(Schema):
         if "result_issue_keys" in data:
             # Build list of issues
             for issue_key in data["result_issue_keys"]:
-                if issue_key not in Config.CACHED_ISSUES:
-                    resp = requests.get(
-                        Config.ISSUE_URL.format(issue=issue_key),
-                        auth=Config.AUTH,
+                issues.append(
+                    fetch(
+                        Config.CACHED_ISSUES,
+                        issue_key,
+                        lambda: load_issue(issue_key, partial=True),
                     )
-                    resp.raise_for_status()
-                    issue_resp = resp.json()
-                    issue = Issue(unknown=EXCLUDE).load(
-                        issue_resp, partial=True
-                    )
-                    Config.CACHED_ISSUES[issue_key] = issue
-                issues.append(Config.CACHED_ISSUES[issue_key])
+                )
         return issues
 
 
-class TestResult(Schema):
+class TestResult(BatchedSchema):
     id = fields.Integer(required=True)
     key = fields.String(required=True)
     comment = HtmlPandocField()
@@ -178,19 +174,11 @@ class TestResult(Schema):
         if "issue_links" in data:
             issue: Issue
             for issue_key in data["issue_links"]:
-                if issue_key not in Config.CACHED_ISSUES:
-                    resp = requests.get(
-                        Config.ISSUE_URL.format(issue=issue_key),
-                        auth=Config.AUTH,
-                    )
-                    resp.raise_for_status()
-                    issue_resp = resp.json()
-                    issue = Issue(unknown=EXCLUDE).load(
-                        issue_resp, partial=True
-                    )
-                    Config.CACHED_ISSUES[issue_key] = issue
-                else:
-                    issue = Config.CACHED_ISSUES[issue_key]
+                issue = fetch(
+                    Config.CACHED_ISSUES,
+                    issue_key,
+                    lambda: load_issue(issue_key, partial=True),
+                )
                 Config.ISSUES_TO_TESTRESULTS.setdefault(issue_key, []).append(
                     data["key"]
                 )
@@ -198,7 +186,7 @@ class TestResult(Schema):
         return issues
 
 
-class TestCycle(Schema):
+class TestCycle(BatchedSchema):
     id = fields.Integer(required=True)
     key = fields.String(required=True)
     name = HtmlPandocField(required=True)
@@ -0,0 +1,226 @@
+# LSST Data Management System
+# Copyright 2018 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+All the test executions of a project, indexed by test case and test cycle
+"""
+import json
+import logging
+import os
+from collections import Counter
+from typing import Iterable
+
+import arrow
+
+from .config import Config
+from .utils import (
+    get_key,
+    get_tc_executions,
+    get_testcase_executions,
+    get_value,
+)
+
+
+def execution_end(execution: dict) -> str:
+    """When an execution ended, as Zephyr writes it, "" if it did not."""
+    for name in ("actualEndDate", "executionDate"):
+        # fix_json turned the missing ones into "None"
+        if execution.get(name) not in (None, "None"):
+            return str(execution[name])
+    return ""
+
+
+def latest_execution(executions: list[dict]) -> dict | None:
+    """The execution ended last, the last listed of those ended at the
+    same time or not ended."""
+    if not executions:
+        return None
+    return sorted(executions, key=execution_end)[-1]
+
+
+class ExecutionIndex:
+    """The executions of a project by test case key and by test cycle id,
+    each list in the order Zephyr lists the executions."""
+
+    def __init__(
+        self,
+        project: str,
+        loaded: str | None = None,
+        executions: Iterable[dict] = (),
+        built: str | None = None,
+    ):
+        self.project = project
+        self.loaded = loaded
+        # when all the executions were last got
+        self.built = built or loaded
+        self.executions: dict[int, dict] = {}
+        self.by_testcase: dict[str, list[dict]] = {}
+        self.by_cycle: dict[str, list[dict]] = {}
+        self.latest: dict[str, dict] = {}
+        # the executions of each test case by status pointer
+        self.statuses: dict[str, Counter] = {}
+        self.add(executions)
+
+    def add(self, executions: Iterable[dict]) -> None:
+        """Add executions, replacing those with the same id, and index them
+        all again."""
+        for execution in executions:
+            self.executions[execution["id"]] = execution
+        self.by_testcase = {}
+        self.by_cycle = {}
+        for execution in self.executions.values():
+            # fix_json turned the missing ones into "None"
+            if isinstance(execution.get("testCase"), dict):
+                key = get_key(execution["testCase"])
+                self.by_testcase.setdefault(key, []).append(execution)
+            if isinstance(execution.get("testCycle"), dict):
+                cycle_id = str(execution["testCycle"]["id"])
+                self.by_cycle.setdefault(cycle_id, []).append(execution)
+        # sorted once for all the test cases, the last one wins
+        self.latest = {}
+        self.statuses = {}
+        for execution in sorted(self.executions.values(), key=execution_end):
+            if not isinstance(execution.get("testCase"), dict):
+                continue
+            key = get_key(execution["testCase"])
+            self.latest[key] = execution
+            statuses = self.statuses.setdefault(key, Counter())
+            if isinstance(execution.get("testExecutionStatus"), dict):
+                statuses[execution["testExecutionStatus"]["self"]] += 1
+
+    def testcase(self, key: str) -> list[dict]:
+        return self.by_testcase.get(key, [])
+
+    def cycle(self, cycle_id: int | str) -> list[dict]:
+        return self.by_cycle.get(str(cycle_id), [])
+
+    def latest_execution(self, key: str) -> dict | None:
+        return self.latest.get(key)
+
+    def status_counts(self, key: str) -> Counter:
+        return self.statuses.get(key, Counter())
+
+    def ended_since(self, since: arrow.Arrow) -> set[str]:
+        """The keys of the test cases with an execution ended since."""
+        keys = set()
+        for key, executions in self.by_testcase.items():
+            for execution in executions:
+                ended = execution.get("actualEndDate")
+                if ended and ended != "None" and arrow.get(ended) >= since:
+                    keys.add(key)
+                    break
+        return keys
+
+
+def get_latest_execution(key: str) -> dict | None:
+    """The last execution of a test case, from the execution index when it
+    is loaded."""
+    index = Config.THE_EXECUTION_INDEX
+    if index is not None:
+        return index.latest_execution(key)
+    return latest_execution(get_testcase_executions(key))
+
+
+def get_status_history(key: str) -> Counter:
+    """The number of executions of a test case by status name, counted
+    when the execution index is built if it is loaded."""
+    index = Config.THE_EXECUTION_INDEX
+    if index is not None:
+        counts = index.status_counts(key)
+    else:
+        counts = Counter(
+            e["testExecutionStatus"]["self"]
+            for e in get_testcase_executions(key)
+            if isinstance(e.get("testExecutionStatus"), dict)
+        )
+    history: Counter = Counter()
+    for status, count in counts.items():
+        history[get_value(status)] += count
+    return history
+
+
+def index_path(project: str) -> str:
+    return os.path.join(Config.CACHE_DIR, f"executions-{project}.json")
+
+
+def read_index(path: str, project: str) -> ExecutionIndex | None:
+    """The index saved by the last incremental run, None if there is none
+    or it was last built from all the executions longer ago than
+    ``Config.VE_SNAPSHOT_MAX_AGE``."""
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.log(logging.WARN, f"Ignoring execution index {path}: {e}")
+        return None
+    built = saved.get("built", saved["loaded"])
+    age = arrow.utcnow() - arrow.get(built)
+    if age.total_seconds() > Config.VE_SNAPSHOT_MAX_AGE:
+        return None
+    return ExecutionIndex(project, saved["loaded"], saved["executions"], built)
+
+
+def save_index(path: str, index: ExecutionIndex) -> None:
+    saved = dict(
+        loaded=index.loaded,
+        built=index.built,
+        executions=list(index.executions.values()),
+    )
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(saved, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def load_execution_index(incremental: bool = False) -> ExecutionIndex:
+    """Page through all the executions of ``Config.PROJECT`` once, so that
+    `get_testcase_executions` and `get_execs` answer from the index.
+    With ``incremental`` only the executions ended since the index saved
+    by the last incremental run, less ``Config.VE_REFRESH_MARGIN``, are
+    got, and the index is saved for the next one. Zephyr gives no update
+    time for executions, one edited or deleted since stays as it was until
+    all are got again, once ``Config.VE_SNAPSHOT_MAX_AGE`` has passed."""
+    project = Config.PROJECT
+    path = index_path(project)
+    started = arrow.utcnow()
+    index = read_index(path, project) if incremental else None
+    params = {"projectKey": project}
+    if index is not None and index.loaded:
+        since = arrow.get(index.loaded).shift(
+            seconds=-Config.VE_REFRESH_MARGIN
+        )
+        params["actualEndDateAfter"] = (
+            since.format("YYYY-MM-DDTHH:mm:ss") + "Z"
+        )
+    else:
+        index = ExecutionIndex(project, built=started.isoformat())
+    executions = get_tc_executions(params)
+    index.add(executions)
+    index.loaded = started.isoformat()
+    print(
+        f"Indexed {len(index.executions)} test executions of {project}, "
+        f"{len(executions)} got from Zephyr."
+    )
+    if incremental:
+        save_index(path, index)
+    Config.THE_EXECUTION_INDEX = index
+    return index
@@ -0,0 +1,278 @@
+# LSST Data Management System
+# Copyright 2018 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Responses of Jira and Zephyr kept on disk between runs
+"""
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, NamedTuple
+
+import requests
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .config import Config
+from .scheduler import ScheduledAdapter
+from .stats import endpoint, get_stats
+
+# use: answer from the cache while an entry is fresh
+# refresh: ask the server again, revalidating what is cached, and only
+#   keep the responses that can be revalidated
+# offline: answer from the cache only, however old
+CACHE_MODES = ("use", "refresh", "offline")
+
+
+class CachedResponse(NamedTuple):
+    status: int
+    headers: dict[str, str]
+    body: bytes
+    stored: float
+
+
+class HttpCache:
+    """On disk store of successful GET responses keyed on a hash of the
+    URL, query included, and the credentials the request was made with.
+    Least recently used entries are evicted once the bodies grow beyond
+    ``max_bytes``. It may be used from several threads, one at a time."""
+
+    def __init__(self, path: str, max_bytes: int):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        columns = [
+            row[1] for row in self.db.execute("PRAGMA table_info(responses)")
+        ]
+        if columns and "used" not in columns:
+            # written by a version without eviction
+            self.db.execute("DROP TABLE responses")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, url TEXT, status INTEGER, headers TEXT, "
+            "body BLOB, stored REAL, size INTEGER, used REAL)"
+        )
+        self.db.commit()
+        (self.total,) = self.db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+
+    @staticmethod
+    def key(request: PreparedRequest) -> str:
+        digest = hashlib.sha256()
+        auth = request.headers.get("Authorization", "")
+        for part in (request.method or "", request.url or "", auth):
+            digest.update(str(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> CachedResponse | None:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT status, headers, body, stored FROM responses "
+                "WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self.db.execute(
+                "UPDATE responses SET used = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self.db.commit()
+        status, headers, body, stored = row
+        return CachedResponse(status, json.loads(headers), body, stored)
+
+    def put(self, key: str, url: str, response: Response) -> None:
+        body = response.content
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    url,
+                    response.status_code,
+                    json.dumps(dict(response.headers)),
+                    body,
+                    now,
+                    len(body),
+                    now,
+                ),
+            )
+            self.db.commit()
+            self.total += len(body)
+            if self.total > self.max_bytes:
+                self.evict()
+
+    def touch(self, key: str) -> None:
+        """Mark an entry the server said is unchanged as fresh again."""
+        with self.lock:
+            self.db.execute(
+                "UPDATE responses SET stored = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self.db.commit()
+
+    def evict(self) -> None:
+        """Drop the least recently used entries down to 90% of the
+        allowed size."""
+        with self.lock:
+            (self.total,) = self.db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            if self.total <= self.max_bytes:
+                return
+            excess = self.total - int(self.max_bytes * 0.9)
+            rows = self.db.execute(
+                "SELECT key, size FROM responses ORDER BY used"
+            )
+            stale = []
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                stale.append((key,))
+                excess -= size
+                self.total -= size
+            self.db.executemany("DELETE FROM responses WHERE key = ?", stale)
+            self.db.commit()
+
+
+_LOCK = threading.Lock()
+
+
+def get_http_cache() -> HttpCache:
+    """The response cache under ``Config.CACHE_DIR``, opened on first
+    use."""
+    with _LOCK:
+        if Config.THE_HTTP_CACHE is None:
+            Config.THE_HTTP_CACHE = HttpCache(
+                os.path.join(Config.CACHE_DIR, "responses.sqlite"),
+                Config.HTTP_CACHE_MAX_BYTES,
+            )
+    return Config.THE_HTTP_CACHE
+
+
+def time_to_live(url: str) -> float:
+    """Seconds a response from ``url`` is used without asking the server,
+    the first of ``Config.HTTP_CACHE_TTLS`` found in the URL or
+    ``Config.HTTP_CACHE_TTL``."""
+    for part, ttl in Config.HTTP_CACHE_TTLS.items():
+        if part in url:
+            return ttl
+    return Config.HTTP_CACHE_TTL
+
+
+def revalidatable(response: Response) -> bool:
+    """Whether the server sent what a later request can revalidate."""
+    return any(name in response.headers for name in ("ETag", "Last-Modified"))
+
+
+class CachingAdapter(ScheduledAdapter):
+    """Answers GET requests from the `HttpCache` following
+    ``Config.HTTP_CACHE_MODE``. Stale entries are revalidated with their
+    ETag or Last-Modified header when the server sent one.
+    Streamed requests and other methods always go to the server, what goes
+    to the server is paced by the `ScheduledAdapter`."""
+
+    def send(  # type: ignore[override]
+        self, request: PreparedRequest, **kwargs: Any
+    ) -> Response:
+        mode = Config.HTTP_CACHE_MODE
+        if mode not in CACHE_MODES or request.method != "GET":
+            return super().send(request, **kwargs)
+        if kwargs.get("stream"):
+            return super().send(request, **kwargs)
+        cache = get_http_cache()
+        key = cache.key(request)
+        cached = cache.get(key)
+        if mode == "offline":
+            if cached is None:
+                raise requests.ConnectionError(
+                    f"{request.url} is not in the HTTP cache", request=request
+                )
+            Config.HTTP_CACHE_STATS["hit"] += 1
+            return self.cached_response(request, cached)
+        url = request.url or ""
+        if (
+            mode == "use"
+            and cached is not None
+            and time.time() - cached.stored < time_to_live(url)
+        ):
+            Config.HTTP_CACHE_STATS["hit"] += 1
+            return self.cached_response(request, cached)
+        if cached is not None:
+            headers = CaseInsensitiveDict(cached.headers)
+            if "ETag" in headers:
+                request.headers["If-None-Match"] = headers["ETag"]
+            if "Last-Modified" in headers:
+                request.headers["If-Modified-Since"] = headers["Last-Modified"]
+        response = super().send(request, **kwargs)
+        if response.status_code == 304 and cached is not None:
+            Config.HTTP_CACHE_STATS["revalidated"] += 1
+            cache.touch(key)
+            return self.cached_response(request, cached)
+        Config.HTTP_CACHE_STATS["miss"] += 1
+        if response.status_code == 200 and (
+            mode == "use" or revalidatable(response)
+        ):
+            cache.put(key, url, response)
+        return response
+
+    def cached_response(
+        self, request: PreparedRequest, cached: CachedResponse
+    ) -> Response:
+        stats = get_stats()
+        if stats:
+            stats.record_cached(endpoint(str(request.url)))
+        return make_response(
+            self, request, cached.status, cached.headers, cached.body
+        )
+
+
+def make_response(
+    adapter: HTTPAdapter,
+    request: PreparedRequest,
+    status: int,
+    headers: dict[str, str],
+    body: bytes,
+) -> Response:
+    """A response to ``request`` as if ``adapter`` had received it."""
+    response = Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = body
+    # read already, iter_content() walks the content
+    response._content_consumed = True  # type: ignore[attr-defined]
+    response.raw = io.BytesIO(body)
+    response.url = request.url or ""
+    response.reason = "OK" if status == 200 else ""
+    response.request = request
+    response.connection = adapter
+    return response
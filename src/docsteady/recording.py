@@ -0,0 +1,146 @@
+# LSST Data Management System
+# Copyright 2018 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Recording of the exchanges of a run with Jira, Zephyr and the image hosts,
+and their replay without a network
+"""
+import atexit
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from base64 import b64decode, b64encode
+from typing import Any
+
+import requests
+from requests import PreparedRequest, Response
+
+from .config import Config
+from .httpcache import CachingAdapter, make_response
+from .stats import endpoint, get_stats
+
+# headers not worth keeping in an archive
+DROPPED_HEADERS = ("set-cookie", "date", "connection", "keep-alive")
+
+
+class Recording:
+    """The exchanges of a run, saved as gzipped JSON lines. Requests are
+    told apart by method, URL and body, never by their credentials, which
+    are not saved."""
+
+    def __init__(self, path: str, replay: bool = False):
+        self.path = path
+        self.replay = replay
+        self.lock = threading.Lock()
+        self.exchanges: dict[str, dict] = {}
+        if replay:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    exchange = json.loads(line)
+                    self.exchanges[exchange["key"]] = exchange
+
+    @staticmethod
+    def key(request: PreparedRequest) -> str:
+        body = request.body or b""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()[:16] if body else ""
+        return f"{request.method} {request.url} {digest}".rstrip()
+
+    def record(self, request: PreparedRequest, response: Response) -> None:
+        headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name.lower() not in DROPPED_HEADERS
+        }
+        key = self.key(request)
+        exchange = dict(
+            key=key,
+            status=response.status_code,
+            headers=headers,
+            body=b64encode(response.content).decode("ascii"),
+        )
+        with self.lock:
+            self.exchanges[key] = exchange
+
+    def response(
+        self, adapter: CachingAdapter, request: PreparedRequest
+    ) -> Response:
+        exchange = self.exchanges.get(self.key(request))
+        if exchange is None:
+            raise requests.ConnectionError(
+                f"{request.url} is not in the recording {self.path}",
+                request=request,
+            )
+        stats = get_stats()
+        if stats:
+            stats.record_cached(endpoint(str(request.url)))
+        return make_response(
+            adapter,
+            request,
+            exchange["status"],
+            exchange["headers"],
+            b64decode(exchange["body"]),
+        )
+
+    def save(self) -> None:
+        if self.replay:
+            return
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with gzip.open(f"{self.path}.tmp", "wt", encoding="utf-8") as f:
+                for exchange in self.exchanges.values():
+                    f.write(json.dumps(exchange) + "\n")
+            os.replace(f"{self.path}.tmp", self.path)
+        logging.log(
+            logging.INFO,
+            f"Recorded {len(self.exchanges)} exchanges to {self.path}",
+        )
+
+
+def start_recording(path: str, replay: bool = False) -> Recording:
+    """Record the exchanges of this run to ``path``, saved when it ends,
+    or replay those recorded there."""
+    recording = Recording(path, replay)
+    Config.THE_RECORDING = recording
+    if not replay:
+        atexit.register(recording.save)
+    return recording
+
+
+class RecordingAdapter(CachingAdapter):
+    """Records the answers of every request, streamed or not and whether
+    they came from the cache or the server, or replays them, following
+    ``Config.THE_RECORDING``."""
+
+    def send(  # type: ignore[override]
+        self, request: PreparedRequest, **kwargs: Any
+    ) -> Response:
+        recording = Config.THE_RECORDING
+        if recording is None:
+            return super().send(request, **kwargs)
+        if recording.replay:
+            return recording.response(self, request)
+        response = super().send(request, **kwargs)
+        recording.record(request, response)
+        return response
@@ -0,0 +1,193 @@
+# LSST Data Management System
+# Copyright 2018 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Pacing of the requests sent to each host, shared by all the sessions
+"""
+import email.utils
+import logging
+import threading
+import time
+from typing import Any
+from urllib.parse import urlparse
+
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+
+from .config import Config
+from .stats import endpoint, get_stats
+
+# answers telling to slow down, retried for idempotent methods
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+
+class HostLimiter:
+    """A token bucket refilled at ``rate`` requests per second holding at
+    most ``burst`` tokens, and a limit on the requests in flight.
+    The limit grows by one per round of successful requests up to
+    ``max_concurrency`` and is halved when the host answers 429 or 5xx.
+    A Retry-After header pauses every request to the host."""
+
+    def __init__(self, rate: float, burst: float, max_concurrency: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.updated = time.monotonic()
+        self.condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                if self.rate > 0:
+                    self.tokens = min(
+                        self.burst,
+                        self.tokens + (now - self.updated) * self.rate,
+                    )
+                self.updated = now
+                wait: float | None = None
+                if self.paused_until > now:
+                    wait = self.paused_until - now
+                elif self.rate > 0 and self.tokens < 1:
+                    wait = (1 - self.tokens) / self.rate
+                elif self.in_flight < int(self.limit):
+                    if self.rate > 0:
+                        self.tokens -= 1
+                    self.in_flight += 1
+                    return
+                # waiting for a request to finish, release() notifies
+                self.condition.wait(wait)
+
+    def release(
+        self, status: int | None, retry_after: float | None = None
+    ) -> None:
+        with self.condition:
+            self.in_flight -= 1
+            if status in RETRY_STATUSES:
+                self.limit = max(1.0, self.limit / 2)
+                if retry_after:
+                    self.paused_until = max(
+                        self.paused_until, time.monotonic() + retry_after
+                    )
+            elif status is not None:
+                self.limit = min(
+                    float(self.max_concurrency), self.limit + 1 / self.limit
+                )
+            self.condition.notify_all()
+
+
+_LOCK = threading.Lock()
+
+
+def get_limiter(host: str) -> HostLimiter:
+    """The limiter of ``host``, created on first use with the rate of
+    ``Config.HTTP_RATE_LIMITS`` or ``Config.HTTP_RATE_LIMIT``."""
+    with _LOCK:
+        if host not in Config.THE_LIMITERS:
+            rate = Config.HTTP_RATE_LIMITS.get(host, Config.HTTP_RATE_LIMIT)
+            Config.THE_LIMITERS[host] = HostLimiter(
+                rate, Config.HTTP_BURST, Config.HTTP_POOL_SIZE
+            )
+        return Config.THE_LIMITERS[host]
+
+
+def retry_after(response: Response) -> float | None:
+    """Seconds to wait given by a Retry-After header, as a number or a
+    date, at most ``Config.HTTP_MAX_RETRY_AFTER``."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = max(0.0, float(value))
+    except ValueError:
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        seconds = max(0.0, date.timestamp() - time.time())
+    if seconds > Config.HTTP_MAX_RETRY_AFTER:
+        logging.log(
+            logging.WARN,
+            f"{response.url} asked to wait {seconds:.0f}s, waiting "
+            f"{Config.HTTP_MAX_RETRY_AFTER}s instead",
+        )
+        seconds = Config.HTTP_MAX_RETRY_AFTER
+    return seconds
+
+
+def response_size(response: Response, stream: bool | None) -> int:
+    """Bytes of the body, read now unless the response is streamed."""
+    if stream:
+        return int(response.headers.get("Content-Length", 0))
+    return len(response.content)
+
+
+class ScheduledAdapter(HTTPAdapter):
+    """Sends each request once its host's `HostLimiter` allows it.
+    Idempotent requests answered with one of ``RETRY_STATUSES`` are sent
+    again up to ``Config.HTTP_RETRIES`` times, after the Retry-After delay
+    or an exponential backoff. The last answer is returned as is for the
+    caller to handle."""
+
+    def send(  # type: ignore[override]
+        self, request: PreparedRequest, **kwargs: Any
+    ) -> Response:
+        limiter = get_limiter(urlparse(str(request.url)).hostname or "")
+        retries = Config.HTTP_RETRIES
+        if request.method not in IDEMPOTENT_METHODS:
+            retries = 0
+        stats = get_stats()
+        attempt = 0
+        while True:
+            limiter.acquire()
+            status = delay = None
+            size = 0
+            started = time.perf_counter()
+            try:
+                response = super().send(request, **kwargs)
+                status = response.status_code
+                delay = retry_after(response)
+                if stats:
+                    size = response_size(response, kwargs.get("stream"))
+            finally:
+                limiter.release(status, delay)
+                if stats:
+                    stats.record(
+                        endpoint(str(request.url)),
+                        status,
+                        time.perf_counter() - started,
+                        size,
+                        retry=attempt > 0,
+                    )
+            if status not in RETRY_STATUSES or attempt >= retries:
+                return response
+            delay = delay or Config.HTTP_BACKOFF * 2**attempt
+            logging.log(
+                logging.INFO,
+                f"{request.url} answered {status}, retrying in {delay:.1f}s",
+            )
+            response.close()
+            time.sleep(delay)
+            attempt += 1
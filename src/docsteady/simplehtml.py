@@ -0,0 +1,361 @@
+# LSST Data Management System
+# Copyright 2018 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Pure python conversion of simple HTML fragments to LaTeX, producing the
+same output as pandoc. Anything outside the supported subset is left to
+pandoc.
+"""
+import re
+from html.parser import HTMLParser
+from typing import List, Tuple
+
+# pandoc wraps its output at 72 columns
+COLUMNS = 72
+
+INLINE = {
+    "strong": "\\textbf{",
+    "b": "\\textbf{",
+    "em": "\\emph{",
+    "i": "\\emph{",
+    "code": "\\texttt{",
+    "a": "\\href{",
+}
+LISTS = {"ul": "itemize", "ol": "enumerate"}
+SUPPORTED = set(INLINE) | set(LISTS) | {"p", "li"}
+
+ESCAPES = {
+    "&": "\\&",
+    "%": "\\%",
+    "$": "\\$",
+    "#": "\\#",
+    "_": "\\_",
+    "{": "\\{",
+    "}": "\\}",
+    "^": "\\^{}",
+    "[": "{[}",
+    "]": "{]}",
+    "\xa0": "~",
+}
+# Escapes that are control words need a separator before a letter
+COMMANDS = {
+    "~": "\\textasciitilde",
+    "\\": "\\textbackslash",
+    "<": "\\textless",
+    ">": "\\textgreater",
+    "|": "\\textbar",
+    "'": "\\textquotesingle",
+    "…": "\\ldots",
+}
+# Typographic quotes and dashes, unless next to another one
+TYPOGRAPHIC = {"‘": "`", "’": "'", "“": "``", "”": "''", "–": "--", "—": "---"}
+ADJACENT = set(TYPOGRAPHIC) | set("-'`\"")
+CODE_ESCAPES = {" ": "\\ ", "`": "\\textasciigrave{}"}
+URL_ESCAPES = {"%": "\\%", "#": "\\#"}
+URL_CHARS = re.compile(r"^[A-Za-z0-9:/?=.,;_%#+@!$&~*()-]+$")
+WHITESPACE = re.compile(r"[ \t\n\r\f]+")
+# A "<" that may or may not open a tag, a tag that is not closed and
+# numeric character references, which are not always decoded the same way
+UNSAFE = re.compile(r"<(?![a-zA-Z/\s\d=])|<[a-zA-Z/][^<>]*(?:<|$)|&#")
+
+# Tokens of a paragraph before it is wrapped
+SPACE = " "
+BREAK = "\n"
+Token = Tuple[str, str]
+
+
+class Unsupported(Exception):
+    """The fragment needs pandoc."""
+
+
+class Node:
+    def __init__(self, tag: str, href: str = ""):
+        self.tag = tag
+        self.href = href
+        self.children: List[Node | str] = []
+
+
+class TreeBuilder(HTMLParser):
+    """Parse the supported subset into a tree of `Node`, raising
+    `Unsupported` on anything else, including markup that is not well
+    formed."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.root = Node("")
+        self.stack = [self.root]
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag == "br" and not attrs:
+            self.stack[-1].children.append(Node("br"))
+            return
+        href = ""
+        if tag == "a":
+            if [name for name, _ in attrs] != ["href"] or any(
+                node.tag == "a" for node in self.stack
+            ):
+                raise Unsupported(tag)
+            href = attrs[0][1] or ""
+        elif tag not in SUPPORTED or attrs:
+            raise Unsupported(tag)
+        node = Node(tag, href)
+        self.stack[-1].children.append(node)
+        self.stack.append(node)
+
+    def handle_startendtag(self, tag: str, attrs: list) -> None:
+        if tag != "br":
+            raise Unsupported(tag)
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag: str) -> None:
+        if len(self.stack) == 1 or self.stack[-1].tag != tag:
+            raise Unsupported(tag)
+        self.stack.pop()
+
+    def handle_data(self, data: str) -> None:
+        children = self.stack[-1].children
+        if children and isinstance(children[-1], str):
+            children[-1] += data
+        else:
+            children.append(data)
+
+    def handle_comment(self, data: str) -> None:
+        raise Unsupported("comment")
+
+    def handle_decl(self, decl: str) -> None:
+        raise Unsupported("declaration")
+
+    def handle_pi(self, data: str) -> None:
+        raise Unsupported("processing instruction")
+
+    def unknown_decl(self, data: str) -> None:
+        raise Unsupported("declaration")
+
+
+def html_to_latex(text: str) -> str | None:
+    """Convert `text` to LaTeX the way ``pandoc -f html -t latex`` does.
+    :return: `None` if `text` uses anything but plain text, paragraphs,
+    line breaks, bold, italics, code, links and lists of plain items.
+    """
+    try:
+        if UNSAFE.search(text):
+            raise Unsupported("markup the parsers may read differently")
+        builder = TreeBuilder()
+        builder.feed(text)
+        builder.close()
+        if len(builder.stack) != 1:
+            raise Unsupported("unclosed")
+        blocks = [b for b in _blocks(builder.root.children) if b]
+    except Unsupported:
+        return None
+    return "\n\n".join(blocks) + "\n"
+
+
+def _blocks(children: List[Node | str]) -> List[str]:
+    blocks = []
+    inlines: List[Node | str] = []
+    for child in children + [Node("p")]:
+        if isinstance(child, str) or child.tag in INLINE or child.tag == "br":
+            inlines.append(child)
+            continue
+        blocks.append(_paragraph(inlines))
+        inlines = []
+        if child.tag == "p":
+            blocks.append(_paragraph(child.children))
+        elif child.tag in LISTS:
+            blocks.append(_list(child))
+        else:
+            raise Unsupported(child.tag)
+    return blocks
+
+
+def _list(node: Node) -> str:
+    env = LISTS[node.tag]
+    lines = [f"\\begin{{{env}}}", "\\tightlist"]
+    for item in node.children:
+        if isinstance(item, str):
+            if WHITESPACE.sub("", item):
+                raise Unsupported("text in list")
+            continue
+        if item.tag != "li":
+            raise Unsupported(item.tag)
+        text = _paragraph(item.children, indent="  ")
+        if not text:
+            raise Unsupported("empty item")
+        lines += ["\\item", text]
+    lines.append(f"\\end{{{env}}}")
+    return "\n".join(lines)
+
+
+def _paragraph(children: List[Node | str], indent: str = "") -> str:
+    lines: List[str] = []
+    words: List[str] = []
+    word = ""
+    for kind, value in _normalize(_inlines(children)):
+        if kind == SPACE:
+            words.append(word)
+            word = ""
+        elif kind == BREAK:
+            lines += _wrap(words + [word + "\\\\"], indent)
+            words = []
+            word = ""
+        else:
+            word += value
+    if words or word:
+        lines += _wrap(words + [word], indent)
+    return "\n".join(lines)
+
+
+def _wrap(words: List[str], indent: str) -> List[str]:
+    """Fill lines greedily like pandoc does."""
+    lines: List[str] = []
+    line = ""
+    for word in words:
+        if line and len(indent + line + " " + word) > COLUMNS:
+            lines.append(indent + line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    lines.append(indent + line)
+    return lines
+
+
+def _inlines(children: List[Node | str]) -> List[Token]:
+    tokens: List[Token] = []
+    for child in children:
+        if isinstance(child, str):
+            for i, part in enumerate(WHITESPACE.split(child)):
+                if i:
+                    tokens.append((SPACE, ""))
+                if part:
+                    tokens.append(("text", _escape(part)))
+        elif child.tag == "br":
+            tokens.append((BREAK, ""))
+        elif child.tag == "code":
+            tokens += _code(child)
+        elif child.tag == "a":
+            tokens += _link(child)
+        elif child.tag in INLINE:
+            tokens.append(("open", INLINE[child.tag]))
+            tokens += _inlines(child.children)
+            tokens.append(("close", "}"))
+        else:
+            raise Unsupported(child.tag)
+    return tokens
+
+
+def _code(node: Node) -> List[Token]:
+    if not all(isinstance(c, str) for c in node.children):
+        raise Unsupported("markup in code")
+    text = WHITESPACE.sub(" ", "".join(str(c) for c in node.children))
+    if not text:
+        return []
+    return [("code", "\\texttt{" + _escape(text, code=True) + "}")]
+
+
+def _link(node: Node) -> List[Token]:
+    if not URL_CHARS.match(node.href):
+        raise Unsupported("url")
+    url = "".join(URL_ESCAPES.get(c, c) for c in node.href)
+    if node.children == [node.href]:
+        return [("code", f"\\url{{{url}}}")]
+    return [
+        ("open", f"\\href{{{url}}}{{"),
+        *_inlines(node.children),
+        ("close", "}"),
+    ]
+
+
+def _normalize(tokens: List[Token]) -> List[Token]:
+    """Collapse spaces the way the HTML reader does: spaces move out of
+    the start and end of formatting, runs of spaces become one and there
+    are none at the start or end of a line."""
+    tokens = [
+        token
+        for i, token in enumerate(tokens)
+        if token[0] != SPACE or BREAK not in _kinds(tokens[i - 1 : i + 2])
+    ]
+    moved = True
+    while moved:
+        moved = False
+        for i in range(len(tokens) - 1):
+            first, second = tokens[i], tokens[i + 1]
+            if (first[0] == "open" and second[0] == SPACE) or (
+                first[0] == SPACE and second[0] == "close"
+            ):
+                tokens[i], tokens[i + 1] = second, first
+                moved = True
+    result: List[Token] = []
+    # kind of the last token that was not a space or the end of formatting
+    last = BREAK
+    for i, token in enumerate(tokens):
+        kind = token[0]
+        if i and kind == "open" and tokens[i - 1][0] == "close":
+            raise Unsupported("adjacent formatting pandoc may merge")
+        if kind == SPACE and (not result or result[-1][0] == SPACE):
+            continue
+        if kind == BREAK:
+            if result and result[-1][0] == SPACE:
+                result.pop()
+            if last in (BREAK, "open", "code"):
+                raise Unsupported("line break pandoc writes with a strut")
+        if last == BREAK and token[1].startswith("~"):
+            raise Unsupported("line break pandoc writes with a strut")
+        result.append(token)
+        if kind not in ("close", SPACE):
+            last = kind
+    while result and result[-1][0] == SPACE:
+        result.pop()
+    return result
+
+
+def _kinds(tokens: List[Token]) -> List[str]:
+    return [kind for kind, _ in tokens]
+
+
+def _escape(text: str, code: bool = False) -> str:
+    out = []
+    for i, c in enumerate(text):
+        after = text[i + 1 : i + 2]
+        if c in ESCAPES:
+            out.append(ESCAPES[c])
+        elif code and c in CODE_ESCAPES:
+            out.append(CODE_ESCAPES[c])
+        elif code and (c in TYPOGRAPHIC or c == "…"):
+            out.append(c)
+        elif c in COMMANDS:
+            out.append(COMMANDS[c])
+            if code or not after:
+                out.append("{}")
+            elif after.isalpha():
+                out.append(" ")
+        elif c in TYPOGRAPHIC:
+            if after in ADJACENT or text[i - 1 : i] in ADJACENT:
+                raise Unsupported(c)
+            out.append(TYPOGRAPHIC[c])
+        elif c == "-" and after == "-":
+            out.append("-\\/")
+        elif c in "!?" and after in "`‘“" and after and not code:
+            out.append(c + "{\\kern0pt}")
+        elif " " <= c <= "~" or c.isalpha():
+            out.append(c)
+        else:
+            raise Unsupported(c)
+    return "".join(out)
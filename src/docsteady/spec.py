@@ -23,27 +23,31 @@ Code for Test Specification Model Generation
 """
 import re
 import sys
-from typing import List
+from typing import Iterable, List
 
-import requests
-from marshmallow import EXCLUDE, INCLUDE, Schema, fields, post_load, pre_load
+from marshmallow import EXCLUDE, INCLUDE, fields, post_load, pre_load
 
+from .cache import fetch
 from .config import Config
+from .conversion import BatchedSchema
 from .formatters import alphanum_key, as_anchor
+from .users import account_ids, resolve_users
 from .utils import (
     HtmlPandocField,
     MarkdownableHtmlPandocField,
     as_arrow,
     create_folders_and_files,
     get_folders,
+    get_rest_session,
     get_value,
     owner_for_id,
     process_links,
     t_case_for_key,
+    warm_pointers,
 )
 
 
-class Issue(Schema):
+class Issue(BatchedSchema):
     key = fields.String(required=True)
     summary = MarkdownableHtmlPandocField()
     jira_url = fields.String()
@@ -57,7 +61,70 @@ class Issue(Schema):
         return data
 
 
-class TestStep(Schema):
+def load_issue(issue_key: str, partial: bool = False) -> dict:
+    """The `Issue` of ``issue_key`` got on its own."""
+    resp = get_rest_session().get(
+        Config.ISSUE_URL.format(issue=issue_key), auth=Config.AUTH
+    )
+    resp.raise_for_status()
+    return Issue(unknown=EXCLUDE).load(resp.json(), partial=partial)
+
+
+def issue_links(loaded: Iterable[dict]) -> list[dict]:
+    """The Zephyr links to Jira issues of test cases or executions, as
+    returned by Zephyr."""
+    links = []
+    for item in loaded:
+        if isinstance(item.get("links"), dict):
+            links.extend(item["links"].get("issues", []))
+    return links
+
+
+def prefetch_issues(
+    links: Iterable[dict], cache: dict, partial: bool = False
+) -> None:
+    """Load the Jira issues of Zephyr issue links with a few searches
+    before the schemas look them up one by one. Fills
+    ``Config.CACHED_POINTERS`` for the link targets and `cache` with the
+    `Issue` of each key. Issues the search does not return are left for
+    the schemas to get on their own.
+    :param links: Zephyr issue links, with issueId and target
+    :param cache: ``Config.CACHED_VELEMENTS`` or ``Config.CACHED_ISSUES``
+    :param partial: load the issues partially, as `cache` expects
+    """
+    targets: dict[str, str] = {}
+    for link in links:
+        target = link.get("target")
+        if not target or "issueId" not in link:
+            continue
+        if Config.CACHED_POINTERS.get(target) in cache:
+            continue
+        targets[str(link["issueId"])] = target
+    ids = list(targets)
+    for start in range(0, len(ids), Config.ISSUE_BATCH_SIZE):
+        chunk = ids[start : start + Config.ISSUE_BATCH_SIZE]
+        params: dict = dict(
+            jql=f"issue in ({','.join(chunk)})",
+            fields="summary",
+            maxResults=len(chunk),
+            validateQuery="warn",
+        )
+        resp = get_rest_session().get(
+            Config.ISSUE_SEARCH_URL, params=params, auth=Config.AUTH
+        )
+        if resp.status_code != 200:
+            continue
+        for issue_resp in resp.json().get("issues", []):
+            Config.CACHED_POINTERS[targets[issue_resp["id"]]] = issue_resp[
+                "key"
+            ]
+            if issue_resp["key"] not in cache:
+                cache[issue_resp["key"]] = Issue(unknown=EXCLUDE).load(
+                    issue_resp, partial=partial
+                )
+
+
+class TestStep(BatchedSchema):
     index = fields.Integer()
     test_case_key = fields.String(data_key="testCaseKey")
     description = MarkdownableHtmlPandocField()
@@ -86,7 +153,7 @@ class TestStep(Schema):
         return data
 
 
-class TestCase(Schema):
+class TestCase(BatchedSchema):
     key = fields.String(required=True)
     keyid = fields.Integer()
     name = HtmlPandocField(required=True)
@@ -179,20 +246,15 @@ class TestCase(Schema):
         if "requirement_issue_keys" in data:
             # Build list of requirements
             for issue_key in data["requirement_issue_keys"]:
-                if issue_key not in Config.CACHED_VELEMENTS.keys():
-                    resp = requests.get(
-                        Config.ISSUE_URL.format(issue=issue_key),
-                        auth=Config.AUTH,
-                    )
-                    resp.raise_for_status()
-                    issue_resp = resp.json()
-                    issue = Issue(unknown=EXCLUDE).load(issue_resp)
-                    Config.CACHED_VELEMENTS[issue_key] = issue
+                issue = fetch(
+                    Config.CACHED_VELEMENTS,
+                    issue_key,
+                    lambda: load_issue(issue_key),
+                )
                 Config.REQUIREMENTS_TO_TESTCASES.setdefault(
                     issue_key, []
                 ).append(data["key"])
-                i = Config.CACHED_VELEMENTS.get(issue_key)
-                issues.append(i)  # type: ignore
+                issues.append(issue)
         return issues
 
     def process_req_links(self, links: dict) -> list | None:
@@ -234,7 +296,7 @@ def get_lvv_details(key: str) -> dict:
     lvv: dict = dict()
     lvv["high_level_req"] = []
     if key != "":
-        resp = requests.get(
+        resp = get_rest_session().get(
             Config.ISSUE_URL.format(issue=key), auth=Config.AUTH
         )
         if resp.status_code != 200:
@@ -258,6 +320,7 @@ def build_spec_model(folder: str) -> tuple[dict, dict, dict]:
 
     # create folders for images and attachments if not already there
     create_folders_and_files()
+    warm_pointers()
 
     max_tests = 100
     startAt = 0
@@ -267,7 +330,7 @@ def build_spec_model(folder: str) -> tuple[dict, dict, dict]:
     requirements: dict = {}
     params: dict = dict(query=query, maxResults=max_tests, startAt=startAt)
     while True:
-        resp = requests.get(
+        resp = get_rest_session().get(
             Config.TESTCASE_SEARCH_URL,
             params=params,
             auth=Config.AUTH,
@@ -279,10 +342,11 @@ def build_spec_model(folder: str) -> tuple[dict, dict, dict]:
         testcases_resp = resp.json()
         tc_count = 0
         testcases_resp.sort(key=lambda tc: alphanum_key(tc["key"]))
+        prefetch_issues(issue_links(testcases_resp), Config.CACHED_VELEMENTS)
+        resolve_users(account_ids(testcases_resp), get_rest_session())
         for testcase_resp in testcases_resp:
             tc_count = tc_count + 1
             testcase = TestCase(unknown=EXCLUDE).load(testcase_resp)
-            testcase["name"] = testcase["name"].rstrip()
             if testcase["key"] not in Config.CACHED_TESTCASES:
                 Config.CACHED_TESTCASES["key"] = testcase
                 if testcase["status"] == "Deprecated":
@@ -0,0 +1,195 @@
+# LSST Data Management System
+# Copyright 2018 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Counts and timings of the requests and pandoc calls of a run, by endpoint
+"""
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from urllib.parse import urlparse
+
+from .cache import Cache
+from .config import Config
+
+API_PREFIX = re.compile(r"^/(?:rest/api/\d+|v2)/")
+ISSUE_KEY = re.compile(r"^[A-Z][A-Z0-9]*-[A-Z]?\d+$")
+NUMBER = re.compile(r"^\d+$")
+ACCOUNT_ID = re.compile(r"^(?:[0-9a-f]{24}|\d+:[0-9a-f-]+)$")
+FILE_NAME = re.compile(r"\.[A-Za-z0-9]{2,4}$")
+
+
+def endpoint(url: str) -> str:
+    """The template of the path of ``url`` with the keys and ids replaced,
+    like ``issue/{key}`` for Jira and Zephyr, prefixed with the host for
+    other servers."""
+    parsed = urlparse(url)
+    host = parsed.hostname or ""
+    path = parsed.path
+    api = host in (
+        urlparse(Config.JIRA_API).hostname,
+        urlparse(Config.ATM_API).hostname,
+    )
+    if api:
+        path = API_PREFIX.sub("/", path)
+    parts = [host] if not api else []
+    for part in path.split("/"):
+        if not part:
+            continue
+        if ISSUE_KEY.match(part):
+            part = "{key}"
+        elif NUMBER.match(part):
+            part = "{id}"
+        elif ACCOUNT_ID.match(part):
+            part = "{accountId}"
+        elif FILE_NAME.search(part):
+            part = "{file}"
+        parts.append(part)
+    return "/".join(parts)
+
+
+class EndpointStats:
+    def __init__(self) -> None:
+        self.seconds: list[float] = []
+        self.statuses: Counter = Counter()
+        self.retries = 0
+        self.cached = 0
+        self.bytes = 0
+
+    def percentile(self, p: float) -> float:
+        """Nearest rank percentile of the latencies."""
+        if not self.seconds:
+            return 0.0
+        ordered = sorted(self.seconds)
+        return ordered[max(0, math.ceil(p * len(ordered)) - 1)]
+
+    def report(self) -> dict:
+        return dict(
+            requests=len(self.seconds),
+            cached=self.cached,
+            retries=self.retries,
+            bytes=self.bytes,
+            statuses=dict(sorted(self.statuses.items())),
+            seconds=round(sum(self.seconds), 3),
+            p50=round(self.percentile(0.5), 3),
+            p90=round(self.percentile(0.9), 3),
+            p99=round(self.percentile(0.99), 3),
+            max=round(max(self.seconds, default=0.0), 3),
+        )
+
+
+class RunStats:
+    """Requests sent, answers taken from the cache and pandoc calls of a
+    run, by endpoint. It may be used from several threads."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.endpoints: dict[str, EndpointStats] = {}
+
+    def _endpoint(self, name: str) -> EndpointStats:
+        if name not in self.endpoints:
+            self.endpoints[name] = EndpointStats()
+        return self.endpoints[name]
+
+    def record(
+        self,
+        name: str,
+        status: int | str | None,
+        seconds: float,
+        size: int = 0,
+        retry: bool = False,
+    ) -> None:
+        with self.lock:
+            stats = self._endpoint(name)
+            stats.seconds.append(seconds)
+            stats.statuses[str(status or "error")] += 1
+            stats.retries += retry
+            stats.bytes += size
+
+    def record_cached(self, name: str) -> None:
+        with self.lock:
+            self._endpoint(name).cached += 1
+
+    def report(self) -> dict:
+        with self.lock:
+            endpoints = {
+                name: stats.report()
+                for name, stats in sorted(self.endpoints.items())
+            }
+        caches = {
+            value.name: dict(value.stats)
+            for value in vars(Config).values()
+            if isinstance(value, Cache)
+        }
+        return dict(
+            endpoints=endpoints,
+            caches=caches,
+            http_cache=dict(Config.HTTP_CACHE_STATS),
+        )
+
+    def table(self) -> str:
+        report = self.report()
+        header = (
+            f"{'endpoint':40} {'requests':>8} {'cached':>7} {'retries':>7} "
+            f"{'MB':>7} {'seconds':>8} {'p50':>6} {'p90':>6} {'p99':>6}"
+        )
+        lines = [header, "-" * len(header)]
+        for name, e in report["endpoints"].items():
+            lines.append(
+                f"{name[:40]:40} {e['requests']:8} {e['cached']:7} "
+                f"{e['retries']:7} {e['bytes'] / 1e6:7.2f} "
+                f"{e['seconds']:8.2f} {e['p50']:6.2f} {e['p90']:6.2f} "
+                f"{e['p99']:6.2f}"
+            )
+        counters = {f"cache {n}": c for n, c in report["caches"].items()}
+        counters["http cache"] = report["http_cache"]
+        for name, counts in counters.items():
+            if counts:
+                counted = ", ".join(f"{k} {v}" for k, v in counts.items())
+                lines.append(f"{name}: {counted}")
+        return "\n".join(lines)
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+_LOCK = threading.Lock()
+
+
+def get_stats() -> RunStats | None:
+    """The statistics of this run, None unless ``Config.STATS`` is set."""
+    if not Config.STATS:
+        return None
+    with _LOCK:
+        if Config.THE_STATS is None:
+            Config.THE_STATS = RunStats()
+    return Config.THE_STATS
+
+
+def report_path(output: str | None) -> str:
+    """The JSON report next to ``output``, or in the working directory
+    when the document goes to the standard output."""
+    if not output:
+        return Config.STATS_REPORT_PATH
+    return f"{os.path.splitext(output)[0]}.stats.json"
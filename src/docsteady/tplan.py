@@ -27,13 +27,15 @@ import sys
 from typing import List
 
 from jinja2 import ChoiceLoader, Environment, FileSystemLoader, PackageLoader
-from marshmallow import EXCLUDE, INCLUDE, Schema, fields, pre_load
+from marshmallow import EXCLUDE, INCLUDE, fields, pre_load
 from zephyr.scale.cloud.endpoints import paths
 
 from .config import Config
+from .conversion import BatchedSchema
 from .cycle import ScriptResult, TestCycle, TestResult
 from .formatters import alphanum_map_sort
-from .spec import TestCase
+from .spec import TestCase, issue_links, prefetch_issues
+from .users import account_ids, resolve_users
 from .utils import (
     HtmlPandocField,
     SubsectionableHtmlPandocField,
@@ -43,14 +45,16 @@ from .utils import (
     download_attachments,
     fix_json,
     get_execs,
+    get_rest_session,
     get_teststeps,
     get_value,
     get_zephyr_api,
     owner_for_id,
+    warm_pointers,
 )
 
 
-class TestPlan(Schema):
+class TestPlan(BatchedSchema):
     key = fields.String(required=True)
     # the name (TPR title) can contain extra characters that requires pandoc.
     # this may break the bib reference generation
@@ -197,6 +201,7 @@ def build_tpr_model(tplan_key: str) -> dict:
     # create folders for images and attachments if not already there
     logging.log(logging.INFO, "Building Test Plan Report Model")
     create_folders_and_files()
+    warm_pointers()
 
     test_cycles_map: dict = {}
     test_results_map: dict = {}
@@ -233,7 +238,7 @@ def build_tpr_model(tplan_key: str) -> dict:
         n_attachments = n_attachments + len(attachments["cycles"][cycle_key])
 
         # executions are now per test case not cycle ...
-        all_execs = get_execs(cycle_key)
+        all_execs = get_execs(cycle_key, test_cycle.get("id"))
         execs = []
         if Config.INCLUDE_ALL_EXECS:
             execs = all_execs
@@ -256,6 +261,8 @@ def build_tpr_model(tplan_key: str) -> dict:
         logging.log(
             logging.INFO, f"Adding {len(execs)} executions to cycle {cycle_id}"
         )
+        prefetch_issues(issue_links(execs), Config.CACHED_ISSUES, True)
+        resolve_users(account_ids(execs), get_rest_session())
         testresults = TestResult(unknown=EXCLUDE).load(
             execs, many=True, partial=True
         )
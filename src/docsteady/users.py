@@ -0,0 +1,131 @@
+# LSST Data Management System
+# Copyright 2018 AURA/LSST.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+
+"""
+Display names of Atlassian accounts, looked up in bulk and kept between runs
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Iterable, List
+
+from requests import Session
+
+from .config import Config
+
+# Zephyr fields holding the account id of a user
+USER_FIELDS = ("owner", "createdBy", "executedById", "assignedToId")
+
+
+class UserDirectory:
+    """Display names by account id, saved as JSON. Names older than
+    ``ttl`` seconds are looked up again."""
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.users: dict[str, dict] = {}
+        try:
+            with open(path) as f:
+                self.users = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.log(logging.WARN, f"Ignoring user directory {path}: {e}")
+
+    def get(self, account_id: str) -> dict | None:
+        user = self.users.get(account_id)
+        if user is None or time.time() - user["time"] > self.ttl:
+            return None
+        return {"displayName": user["displayName"]}
+
+    def put_many(self, users: dict[str, dict]) -> None:
+        now = time.time()
+        with self.lock:
+            for account_id, user in users.items():
+                self.users[account_id] = {
+                    "displayName": user["displayName"],
+                    "time": now,
+                }
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(f"{self.path}.tmp", "w") as f:
+                json.dump(self.users, f)
+            os.replace(f"{self.path}.tmp", self.path)
+
+
+_LOCK = threading.Lock()
+
+
+def get_user_directory() -> UserDirectory | None:
+    """The user directory under ``Config.CACHE_DIR`` or None if caching is
+    turned off."""
+    if not Config.USER_CACHE:
+        return None
+    with _LOCK:
+        if not Config.THE_USER_DIRECTORY:
+            Config.THE_USER_DIRECTORY = UserDirectory(
+                os.path.join(Config.CACHE_DIR, "users.json"),
+                Config.USER_CACHE_TTL,
+            )
+    return Config.THE_USER_DIRECTORY
+
+
+def account_ids(loaded: Iterable[dict]) -> List[str]:
+    """The account ids of the users named in Zephyr objects."""
+    ids = []
+    for item in loaded:
+        for field in USER_FIELDS:
+            value = item.get(field)
+            if isinstance(value, dict):
+                value = value.get("accountId")
+            if isinstance(value, str) and value and value != "None":
+                ids.append(value)
+    return list(dict.fromkeys(ids))
+
+
+def resolve_users(ids: Iterable[str], rs: Session) -> None:
+    """Add the users not in ``Config.CACHED_USERS`` yet, from the user
+    directory or with one Jira request per ``Config.USER_BATCH_SIZE``
+    users. Users Jira does not return are left out."""
+    directory = get_user_directory()
+    missing = []
+    for account_id in dict.fromkeys(ids):
+        if account_id in Config.CACHED_USERS:
+            continue
+        known = directory.get(account_id) if directory else None
+        if known is not None:
+            Config.CACHED_USERS[account_id] = known
+        else:
+            missing.append(account_id)
+    found: dict[str, dict] = {}
+    for start in range(0, len(missing), Config.USER_BATCH_SIZE):
+        chunk = missing[start : start + Config.USER_BATCH_SIZE]
+        params: dict = dict(accountId=chunk, maxResults=len(chunk))
+        resp = rs.get(Config.USER_BULK_URL, params=params, auth=Config.AUTH)
+        if resp.status_code != 200:
+            continue
+        for user in resp.json().get("values", []):
+            found[user["accountId"]] = user
+    Config.CACHED_USERS.update(found)
+    if directory and found:
+        directory.put_many(found)
@@ -21,28 +21,32 @@
 """
 Code for Test Specification Model Generation
 """
+import copy
+import html
 import logging
 import os
 import re
 import typing
-import warnings
 from base64 import b64encode
-from collections import OrderedDict
 from os.path import dirname, exists
 from typing import Any, List, MutableMapping
 from urllib.parse import urljoin, urlparse
 
 import arrow
-import pypandoc
+import lxml.html
 import requests
-from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning
 from marshmallow import EXCLUDE, fields
 from requests import Session
+from urllib3.util.retry import Retry
 from zephyr import ZephyrScale
 from zephyr.scale.cloud.cloud_api import CloudApiWrapper
 from zephyr.scale.cloud.endpoints import paths
 
+from .cache import fetch
 from .config import Config
+from .conversion import convert
+from .recording import RecordingAdapter
+from .users import get_user_directory, resolve_users
 
 global THE_SESSION
 
@@ -57,14 +61,15 @@ class HtmlPandocField(fields.String):
         self, value: Any, attr: Any, data: Any, **kwargs: Any
     ) -> Any:
         if isinstance(value, str) and Config.TEMPLATE_LANGUAGE:
-            value = download_and_rewrite_images(value)
-            value = pypandoc.convert_text(
-                value, Config.TEMPLATE_LANGUAGE, format="html"
-            ).replace("height=\\textheight", "")
-            if Config.TEMPLATE_LANGUAGE == "latex":
-                value = cite_docushare_handles(value)
+            value = preprocess_html(value)
+            return convert(value, "html", self._finish, _group(self))
         return value.strip()
 
+    @staticmethod
+    def _finish(value: str) -> str:
+        cite = Config.TEMPLATE_LANGUAGE == "latex"
+        return postprocess_latex(value, height="", cite=cite).strip()
+
 
 class SubsectionableHtmlPandocField(fields.String):
     """
@@ -85,30 +90,62 @@ class SubsectionableHtmlPandocField(fields.String):
         self, value: Any, attr: Any, data: Any, **kwargs: Any
     ) -> Any:
         if isinstance(value, str) and Config.TEMPLATE_LANGUAGE:
-            value = download_and_rewrite_images(value)
-            value = rewrite_strong_to_subsection(value, self.extractable)
-            value = pypandoc.convert_text(
-                value, Config.TEMPLATE_LANGUAGE, format="html"
-            )
-            if Config.TEMPLATE_LANGUAGE == "latex":
-                value = cite_docushare_handles(value)
+            value = preprocess_html(value, self.extractable)
+            return convert(value, "html", self._finish, _group(self))
         return value
 
+    @staticmethod
+    def _finish(value: str) -> str:
+        cite = Config.TEMPLATE_LANGUAGE == "latex"
+        return postprocess_latex(value, cite=cite)
 
-def cite_docushare_handles(text: str) -> str:
-    """This will find matching docushare handles and replace
-    the text with the ``\\citeds{text}``."""
-    output_tex = ""
-    for entry in text.split(" "):
-        if not ("href" in entry or "url" in entry):
-            output_tex = (
-                output_tex
-                + " "
-                + Config.DOCUSHARE_DOC_PATTERN.sub(r"\\citeds{\1\2}", entry)
-            )
-        else:
-            output_tex = output_tex + " " + entry
-    return output_tex
+
+def _group(field: fields.Field) -> str:
+    """Lazy conversions of the same schema field are done together."""
+    return f"{type(field.parent).__name__}.{field.name}"
+
+
+# One pass over the LaTeX of a field. Tokens with a link are only
+# matched whole so handles in URLs are left alone.
+LATEX_FIXES = re.compile(
+    r"(?<![^ ])(?P<link>[^ ]*(?:href|url)[^ ]*)"
+    r"|(?P<height>height=\\textheight)"
+    r"|\b(?P<doc>" + "|".join(Config.DOC_NAMES) + r")(?P<number>-\d+)\b(?!-)"
+)
+HEIGHT = "height=\\textheight"
+
+
+def postprocess_latex(
+    text: str, height: str | None = None, cite: bool = False
+) -> str:
+    """Fix up the LaTeX pandoc made of a field in one pass.
+    :param height: replacement for the image heights pandoc adds, if any
+    :param cite: replace docushare handles with ``\\citeds{handle}``,
+    this adds a leading space
+    """
+    if height is None and not cite:
+        return text
+
+    def fix(match: re.Match) -> str:
+        if match["link"] is not None:
+            if height is None:
+                return match["link"]
+            return match["link"].replace(HEIGHT, height)
+        if match["height"] is not None:
+            return match[0] if height is None else height
+        if not cite:
+            return match[0]
+        return f"\\citeds{{{match['doc']}{match['number']}}}"
+
+    text = LATEX_FIXES.sub(fix, text)
+    return " " + text if cite else text
+
+
+LINE_BREAK = re.compile(r"<br\s*/?>")
+NON_BREAKING_SPACE = re.compile("\xa0|&nbsp;|&#160;")
+# control characters XML, and so lxml, does not accept, like the vertical
+# tab of Word soft line breaks
+XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
 
 
 class MarkdownableHtmlPandocField(fields.String):
@@ -124,23 +161,24 @@ class MarkdownableHtmlPandocField(fields.String):
         if value and isinstance(value, str) and Config.TEMPLATE_LANGUAGE:
             # If it exists, look for markdown text
             # Remove spurious character occasionally generated by Jira API
-            value = download_and_rewrite_images(value).replace("Â", "")
+            value = preprocess_html(value).replace("Â", "")
             # normalizes HTML, replace breaks with newline, non-breaking spaces
-            description_txt = value.replace("<br/>", "\n").replace("\xa0", " ")
+            description_txt = NON_BREAKING_SPACE.sub(
+                " ", LINE_BREAK.sub("\n", value)
+            )
             # matches `[markdown]: #` at the top of description
             if re.match(
                 "\\[markdown\\].*:.*#(.*)", description_txt.splitlines()[0]
             ):
                 # Assume github-flavored markdown
-                value = pypandoc.convert_text(
-                    description_txt, Config.TEMPLATE_LANGUAGE, format="gfm"
-                )
-            else:
-                value = pypandoc.convert_text(
-                    value, Config.TEMPLATE_LANGUAGE, format="html"
-                ).replace("height=\\textheight", " ")
+                return convert(description_txt, "gfm", str, _group(self))
+            return convert(value, "html", self._finish, _group(self))
         return value
 
+    @staticmethod
+    def _finish(value: str) -> str:
+        return postprocess_latex(value, height=" ")
+
 
 def as_arrow(datestring: str) -> arrow.Arrow:
     return arrow.get(datestring).to(Config.TIMEZONE)
@@ -153,16 +191,26 @@ def owner_for_id(owner_id: str | dict) -> str:
         oid: str = owner_id
     if type(owner_id) is dict:
         oid = owner_id["accountId"]
-    user_resp: dict = {"displayName": oid}
-    if oid not in Config.CACHED_USERS:
-        sess = get_rest_session()
-        # https://rubinobs.atlassian.net/rest/api/2/user?accountId=
-        url = f"{Config.JIRA_API}user?accountId={oid}"
-        resp = sess.get(url, auth=Config.AUTH)
-        resp.raise_for_status()
-        user_resp = resp.json()
-        Config.CACHED_USERS[oid] = user_resp
-    return Config.CACHED_USERS[oid]["displayName"]
+    return fetch(Config.CACHED_USERS, oid, lambda: load_user(oid))[
+        "displayName"
+    ]
+
+
+def load_user(oid: str) -> dict:
+    """A user with its display name, from a bulk lookup or on its own."""
+    sess = get_rest_session()
+    resolve_users([oid], sess)
+    if oid in Config.CACHED_USERS:
+        return Config.CACHED_USERS[oid]
+    # https://rubinobs.atlassian.net/rest/api/2/user?accountId=
+    url = f"{Config.JIRA_API}user?accountId={oid}"
+    resp = sess.get(url, auth=Config.AUTH)
+    resp.raise_for_status()
+    user_resp = resp.json()
+    directory = get_user_directory()
+    if directory:
+        directory.put_many({oid: user_resp})
+    return user_resp
 
 
 def t_case_for_key(test_case_key: str) -> dict[str, Any]:
@@ -177,106 +225,156 @@ def t_case_for_key(test_case_key: str) -> dict[str, Any]:
     # Prevent circular import
     from .spec import TestCase
 
-    cached_testcase_resp = Config.CACHED_TESTCASES.get(test_case_key)
-    if not cached_testcase_resp:
-        zapi = get_zephyr_api()
-        resp = zapi.test_cases.get_test_case(test_case_key)
-        if resp:
-            testcase = TestCase(unknown=EXCLUDE).load(resp)
-            Config.CACHED_TESTCASES[test_case_key] = testcase
-        else:
-            testcase = {
-                "objective": "This Test Case has been archived. "
-                "Information here may not completed.",
-                "key": test_case_key,
-                "status": "ARCHIVED",
-            }
-        cached_testcase_resp = testcase
-    return cached_testcase_resp
+    def load() -> dict | None:
+        resp = get_zephyr_api().test_cases.get_test_case(test_case_key)
+        return TestCase(unknown=EXCLUDE).load(resp) if resp else None
 
+    testcase = fetch(Config.CACHED_TESTCASES, test_case_key, load)
+    if not testcase:
+        testcase = {
+            "objective": "This Test Case has been archived. "
+            "Information here may not completed.",
+            "key": test_case_key,
+            "status": "ARCHIVED",
+        }
+    return testcase
 
-@typing.no_type_check
-def download_and_rewrite_images(value: str) -> str:
-    warnings.filterwarnings("ignore", category=MarkupResemblesLocatorWarning)
-    soup = BeautifulSoup(value.encode("utf-8"), "html.parser")
+
+def preprocess_html(value: str, extractable: list | None = None) -> str:
+    """
+    Prepare an HTML field for pandoc in a single parse: images are
+    downloaded and pointed to the local files and, with `extractable`,
+    bold names at the top level become subsection headings.
+    Text without markup is returned as is.
+    :param extractable: List of names that are extractable
+    :return: New HTML
+    """
+    if "<" not in value:
+        return value
+    value = XML_INVALID.sub(" ", value)
+    root = lxml.html.fragment_fromstring(value, create_parent="div")
     rest_location = urljoin(Config.JIRA_INSTANCE, "rest")
-    for img in soup.find_all("img"):
-        try:  # img["style"] before typing ..
-            img_width = re.sub("[^0-9]", "", img["style"])
-        except Exception as w:
-            logging.log(logging.WARN, w)
-            img_width = "150"
-        img_url = urljoin(rest_location, img["src"])
-        url_path = urlparse(img_url).path[1:]
-        img_name = os.path.basename(url_path).replace(".", "_")
-        fs_path = Config.IMAGE_FOLDER + img_name
-        if Config.DOWNLOAD_IMAGES:
-            os.makedirs(dirname(fs_path), exist_ok=True)
-            existing_files = os.listdir(dirname(fs_path))
-            # Look for a file in this path, we don't know what the extension is
-            for existing_file in existing_files:
-                if fs_path in existing_file:
-                    fs_path = existing_file
-            if not exists(fs_path):
-                errstr = None
-                if img_url.startswith(Config.JIRA_INSTANCE):
-                    try:
-                        resp = requests.get(img_url, auth=Config.AUTH)
-                    except ConnectionError as ce:
+    for img in list(root.iter("img")):
+        if not rewrite_image(img, rest_location):
+            break
+    if extractable is None:
+        return "".join(_top_level_nodes(root))
+    for elem in root:
+        if elem.tag == "strong":
+            element_name = elem.text_content().lower().replace(" ", "_")
+            if element_name in extractable:
+                # h2 appears as subsection in latex via pandoc
+                elem.tag = "h2"
+    return "".join(node + "\n" for node in _top_level_nodes(root))
+
+
+def _top_level_nodes(root: Any) -> List[str]:
+    nodes = [html.escape(root.text, quote=False)] if root.text else []
+    for elem in root:
+        nodes.append(
+            lxml.html.tostring(elem, encoding="unicode", with_tail=False)
+        )
+        if elem.tail:
+            nodes.append(html.escape(elem.tail, quote=False))
+    return nodes
+
+
+def _follows_break(img: Any) -> bool:
+    """Whether the node before `img` in document order is a line break,
+    or there is none."""
+    previous = img.getprevious()
+    if previous is None:
+        parent = img.getparent()
+        return not parent.text and parent.getparent() is None
+    if previous.tail:
+        return False
+    while len(previous):
+        if previous[-1].tail:
+            return False
+        previous = previous[-1]
+    return not previous.text and previous.tag == "br"
+
+
+@typing.no_type_check
+def rewrite_image(img: Any, rest_location: str) -> bool:
+    """
+    Download the image and point `img` to the local file.
+    :return: False if the download failed and `img` was replaced by an
+    error message
+    """
+    try:  # img["style"] before typing ..
+        img_width = re.sub("[^0-9]", "", img.attrib["style"])
+    except Exception as w:
+        logging.log(logging.WARN, w)
+        img_width = "150"
+    img_url = urljoin(rest_location, img.attrib["src"])
+    url_path = urlparse(img_url).path[1:]
+    img_name = os.path.basename(url_path).replace(".", "_")
+    fs_path = Config.IMAGE_FOLDER + img_name
+    if Config.DOWNLOAD_IMAGES:
+        os.makedirs(dirname(fs_path), exist_ok=True)
+        existing_files = os.listdir(dirname(fs_path))
+        # Look for a file in this path, we don't know what the extension is
+        for existing_file in existing_files:
+            if fs_path in existing_file:
+                fs_path = existing_file
+        if not exists(fs_path):
+            errstr = None
+            if img_url.startswith(Config.JIRA_INSTANCE):
+                try:
+                    resp = get_rest_session().get(img_url, auth=Config.AUTH)
+                except ConnectionError as ce:
+                    Config.exeuction_errored = True
+                    errstr = f"Failed to get {img_url}: {ce}"
+            else:
+                # the rest api does not work for images in smartbear
+                try:
+                    if "cloudfront" in img_url or "smartbear" in img_url:
+                        resp = get_zephy_image(img_url)
+                    else:
+                        resp = get_http_session().get(img_url)
+                    resp.raise_for_status()
+                except requests.exceptions.HTTPError as err:
+                    # cloudfront is private smartbear will not allow access
+                    # so its not an error it's a feature
+                    if "cloudfront" in img_url:
+                        logging.log(
+                            logging.WARN, f"You can not access {img_url}"
+                        )
+                        errstr = "No access to cloudfront images."
+                    else:
                         Config.exeuction_errored = True
-                        errstr = f"Failed to get {img_url}: {ce}"
-                else:
-                    # the rest api does not work for images in smartbear
-                    try:
-                        if "cloudfront" in img_url or "smartbear" in img_url:
-                            resp = get_zephy_image(img_url)
-                        else:
-                            resp = requests.get(img_url)
-                        resp.raise_for_status()
-                    except requests.exceptions.HTTPError as err:
-                        # cloudfront is private smartbear will not allow access
-                        # so its not an error it's a feature
-                        if "cloudfront" in img_url:
-                            logging.log(
-                                logging.WARN, f"You can not access {img_url}"
-                            )
-                            errstr = "No access to cloudfront images."
-                        else:
-                            Config.exeuction_errored = True
-                            errstr = str(err)
-                if errstr is not None:
-                    print(errstr)
-                    # in order the final user can see where the problem is
-                    img.insert_before(
-                        soup.new_tag("<b>Image Download Error</b>")
-                    )
-                    img.decompose()
-                    return str(soup)
-                extension = None
-                if "png" in resp.headers["content-type"]:
-                    extension = "png"
-                elif "jpeg" in resp.headers["content-type"]:
-                    extension = "jpg"
-                elif "gif" in resp.headers["content-type"]:
-                    extension = "gif"
-                elif "svg" in resp.headers["content-type"]:
-                    extension = "svg"
-                fs_pathe = f"{fs_path}.{extension}"
-                with open(fs_pathe, "w+b") as img_f:
-                    img_f.write(resp.content)
-        if (
-            img.previous_element is not None
-            and img.previous_element.name != "br"
-        ):
-            img.insert_before(soup.new_tag("br"))
-        img["style"] = ""
-        # fixing the aspect ratio of images is working only with pandoc 1.19.1
-        img["width"] = f"{img_width}px"
-        img["display"] = "block"
-        img["src"] = fs_path
-        # Latex includegrpahics does not need extention -
-        # svg will have to be converted anyway
-    return str(soup)
+                        errstr = str(err)
+            if errstr is not None:
+                print(errstr)
+                # in order the final user can see where the problem is
+                error = lxml.html.Element("b")
+                error.text = "Image Download Error"
+                img.addprevious(error)
+                img.drop_tree()
+                return False
+            extension = None
+            if "png" in resp.headers["content-type"]:
+                extension = "png"
+            elif "jpeg" in resp.headers["content-type"]:
+                extension = "jpg"
+            elif "gif" in resp.headers["content-type"]:
+                extension = "gif"
+            elif "svg" in resp.headers["content-type"]:
+                extension = "svg"
+            fs_pathe = f"{fs_path}.{extension}"
+            with open(fs_pathe, "w+b") as img_f:
+                img_f.write(resp.content)
+    if not _follows_break(img):
+        img.addprevious(lxml.html.Element("br"))
+    img.set("style", "")
+    # fixing the aspect ratio of images is working only with pandoc 1.19.1
+    img.set("width", f"{img_width}px")
+    img.set("display", "block")
+    img.set("src", fs_path)
+    # Latex includegrpahics does not need extention -
+    # svg will have to be converted anyway
+    return True
 
 
 def get_zephy_image(img_url: str) -> requests.Response:
@@ -285,12 +383,12 @@ def get_zephy_image(img_url: str) -> requests.Response:
         "Authorization": "Bearer %s" % Config.ZEPHYR_TOKEN,
         "JWT": "%s" % Config.ZEPHYR_TOKEN,
     }
-    rs: Session = requests.Session()
-    rs.headers = headers
-    rs.cookies.set("JWT", Config.ZEPHYR_TOKEN)
+    if not Config.THE_IMAGE_SESSION:
+        Config.THE_IMAGE_SESSION = pooled_session(headers)
+        Config.THE_IMAGE_SESSION.cookies.set("JWT", Config.ZEPHYR_TOKEN)
 
     # params = {"return_raw": False} does not work so not sure if i need raw
-    resp = rs.get(img_url)
+    resp = Config.THE_IMAGE_SESSION.get(img_url)
     return resp
 
 
@@ -313,11 +411,7 @@ def download_attachments(adict: dict) -> list[dict[str, str]]:
 
         # download the attachment
         try:
-            zs = get_zephyr_api().session
-            b4 = zs.base_url
-            zs.base_url = ""
-            resp = zs.get(doc["url"])
-            zs.base_url = b4
+            resp = zephyr_session(absolute=True).get(doc["url"])
             with open(fs_path, "w+b") as att_f:
                 att_f.write(resp.content)
             # add attachment information to the list
@@ -361,54 +455,6 @@ def create_folders_and_files() -> None:
             pass
 
 
-@typing.no_type_check
-def rewrite_strong_to_subsection(content: str, extractable: list) -> str:
-    """
-    Extract specific "strong" elements and rewrite them to headings so
-    they appear as subsections in Latex
-    :param extractable: List of names that are extractable
-    :param content: HTML to parse
-    :return: New HTML
-    """
-    # The default is to preserve order,
-    preserve_order = True
-    soup = BeautifulSoup(content, "html.parser")
-    element_neighbor_text = ""
-    seen_name: str | None = None
-    shelved: list[str] = []
-    new_order = shelved if preserve_order else []
-    found_items = OrderedDict()
-    for elem in soup.children:
-        if "strong" == elem.name:
-            if seen_name:
-                found_items[seen_name] = element_neighbor_text
-                new_order.append(element_neighbor_text)
-                seen_name = None
-            else:
-                shelved.append(element_neighbor_text)
-
-            element_neighbor_text = ""
-            element_name = elem.text.lower().replace(" ", "_")
-            if element_name in extractable:
-                seen_name = element_name
-                # h2 appears as subsection in latex via pandoc
-                elem.name = "h2"
-
-        element_neighbor_text += str(elem) + "\n"
-
-    if seen_name:
-        found_items[seen_name] = element_neighbor_text
-        new_order.append(element_neighbor_text)
-    else:
-        shelved.append(element_neighbor_text)
-
-    # Note: Could sort according to found_items.keys()
-    # if not preserve_order:
-    #     new_order = list(found_items.values())
-    #     new_order.extend(shelved)
-    return "".join(new_order)
-
-
 # FIXME: This can be removed ATM API testcases/search API is fixed
 def get_folders(target_folder: str) -> list[str]:
     """
@@ -462,9 +508,27 @@ def get_zephyr() -> ZephyrScale:
         Config.THE_ZEPHYR = ZephyrScale(
             base_url=Config.ATM_API, token=Config.ZEPHYR_TOKEN
         )
+        rs = zephyr_requests_session(Config.THE_ZEPHYR)
+        if rs is not None:
+            mount_pool(rs)
     return Config.THE_ZEPHYR
 
 
+def zephyr_requests_session(zephyr: ZephyrScale) -> Session | None:
+    """The requests session Zephyr calls go through, None with a warning if
+    it cannot be found and the calls are not pooled."""
+    # zephyr-python-api 0.1.0 keeps it in the private ZephyrSession._session
+    rs = getattr(zephyr.api.session, "_session", None)
+    if not isinstance(rs, Session):
+        logging.log(
+            logging.WARN,
+            "No requests session in the Zephyr API client, "
+            "Zephyr requests are not pooled, cached or paced.",
+        )
+        return None
+    return rs
+
+
 def get_zephyr_api() -> CloudApiWrapper:
     return get_zephyr().api
 
@@ -487,14 +551,54 @@ def get_rest_session() -> Session:
     headers: MutableMapping[str, str | bytes] = {
         "accept": "application/json",
         "authorization": "Basic %s" % connection_str,
-        "Connection": "close",
     }
-    rs: Session = requests.Session()
-    rs.headers = headers
+    rs = pooled_session(headers)
     Config.THE_SESSION = rs
     return rs
 
 
+def get_http_session() -> Session:
+    """Session without credentials for hosts other than Jira and Zephyr"""
+    if not Config.THE_HTTP_SESSION:
+        Config.THE_HTTP_SESSION = pooled_session()
+    return Config.THE_HTTP_SESSION
+
+
+def pooled_session(
+    headers: MutableMapping[str, str | bytes] | None = None
+) -> Session:
+    """A session keeping its connections alive, see `mount_pool`.
+    :param headers: replace the default headers
+    """
+    rs: Session = requests.Session()
+    if headers is not None:
+        rs.headers = headers
+    mount_pool(rs)
+    return rs
+
+
+def mount_pool(rs: Session) -> None:
+    """Keep up to ``Config.HTTP_POOL_SIZE`` connections to each host alive
+    and retry idempotent requests on connection errors. Throttling and
+    server errors are retried by the `ScheduledAdapter` pacing the requests
+    to each host. GET responses go through the cache kept between runs,
+    and every exchange may be recorded or replayed, see
+    `RecordingAdapter`."""
+    retries = Retry(
+        total=Config.HTTP_RETRIES,
+        backoff_factor=Config.HTTP_BACKOFF,
+        status=0,
+        raise_on_status=False,
+    )
+    adapter = RecordingAdapter(
+        pool_connections=Config.HTTP_POOL_SIZE,
+        pool_maxsize=Config.HTTP_POOL_SIZE,
+        max_retries=retries,
+    )
+    rs.mount("https://", adapter)
+    rs.mount("http://", adapter)
+
+
 def get_key(pointer: dict, key: str = "self") -> str:
     """
     the self in some poinnters has the KEY embeded ..
@@ -512,19 +616,25 @@ def get_id(pointer: dict, key: str = "id") -> str:
 
 def get_via_zephyr(url: str) -> dict:
     """Zephyr has a bunch of relative urls BUT frequntely returns FULL urls
-    so temporarily store the base URL get the full url restore the base url.
+    which are fetched without the base URL.
 
     The Zephyr response is a json dict of the values
     returned from the url call.
     """
 
+    return zephyr_session(absolute=url.startswith("http")).get(url)
+
+
+def zephyr_session(absolute: bool = False) -> Any:
+    """The session of the Zephyr API or, with ``absolute``, a copy sharing
+    its connections for full URLs. The base url of the shared session is
+    never changed, as that would affect requests made by other threads.
+    """
     rs = get_zephyr_api().session
-    b4 = rs.base_url
-    if url.startswith("http"):
+    if absolute:
+        rs = copy.copy(rs)
         rs.base_url = ""
-    result = rs.get(url)
-    rs.base_url = b4
-    return result
+    return rs
 
 
 def get_value(pointer: dict | str, key: str = "self") -> str:
@@ -539,26 +649,65 @@ def get_value(pointer: dict | str, key: str = "self") -> str:
         return pointer
     if type(pointer) is dict:
         p = pointer[key]
-    if p not in Config.CACHED_POINTERS:
-        if p.startswith(Config.JIRA_INSTANCE):
-            rs = get_rest_session()
-            hresult = rs.get(p)
-            hresult.raise_for_status()
-            result: dict = hresult.json()
-        else:
-            result = get_via_zephyr(p)
-        keys = ["name", "key", "id"]
-        key = "unknown"
-        for k in keys:
-            if k in result:
-                key = k
-                break
-        if key in result:
-            Config.CACHED_POINTERS[p] = result[key]
-        else:
-            Config.CACHED_POINTERS[p] = result
-
-    return Config.CACHED_POINTERS[p]
+    return fetch(Config.CACHED_POINTERS, p, lambda: load_pointer(p))
+
+
+def load_pointer(p: str) -> str:
+    if p.startswith(Config.JIRA_INSTANCE):
+        rs = get_rest_session()
+        hresult = rs.get(p)
+        hresult.raise_for_status()
+        result: dict = hresult.json()
+    else:
+        result = get_via_zephyr(p)
+    return pointer_value(result)
+
+
+def pointer_value(result: dict) -> Any:
+    """The name, key or id of what a pointer points to."""
+    keys = ["name", "key", "id"]
+    key = "unknown"
+    for k in keys:
+        if k in result:
+            key = k
+            break
+    if key in result:
+        return result[key]
+    return result
+
+
+# Zephyr tables of things pointed to by id, see warm_pointers
+POINTER_TABLES = ["statuses", "priorities", "folders", "environments"]
+
+
+def warm_pointers() -> None:
+    """Load the Zephyr statuses, priorities, folders, environments and
+    projects in a few paged requests so `get_value` finds the pointers
+    to them in ``Config.CACHED_POINTERS``."""
+    if not Config.WARM_POINTERS or Config.POINTERS_WARMED:
+        return
+    Config.POINTERS_WARMED = True
+    session = get_zephyr_api().session
+    tables = {
+        table: {"projectKey": Config.PROJECT} for table in POINTER_TABLES
+    }
+    tables["projects"] = {}
+    for table, params in tables.items():
+        start = 0
+        try:
+            while True:
+                page = session.get(
+                    table, params=dict(params, maxResults=1000, startAt=start)
+                )
+                for value in page["values"]:
+                    pointer = f"{Config.ATM_API}{table}/{value['id']}"
+                    Config.CACHED_POINTERS[pointer] = pointer_value(value)
+                start += len(page["values"])
+                if page.get("isLast", True) or not page["values"]:
+                    break
+        except (requests.exceptions.RequestException, KeyError) as e:
+            logging.log(logging.WARN, f"Could not load Zephyr {table}: {e}")
+    logging.log(logging.INFO, f"{len(Config.CACHED_POINTERS)} pointers loaded")
 
 
 def fix_json(json: dict) -> dict:
@@ -581,9 +730,8 @@ def get_teststeps(
     steps = []
     max = 1000
     params = {"maxResults": str(max)}
-    zapi = get_zephyr_api().session
+    zapi = zephyr_session()
     url = str.format(burl, id)
-    b4 = zapi.base_url
     done = False
     index = 0
     startAt = 0
@@ -592,7 +740,7 @@ def get_teststeps(
         done = resp.get("isLast") is True
         if not done:
             url = resp.get("next")
-            zapi.base_url = ""
+            zapi = zephyr_session(absolute=True)
             startAt += max
             params["startAt"] = str(startAt)
         if "values" in resp:
@@ -605,37 +753,43 @@ def get_teststeps(
                 index += 1
             steps += vals
 
-    zapi.base_url = b4
     return steps
 
 
-def get_execs(cycleId: str) -> List[dict]:
+def get_execs(cycleId: str, cycle_id: int | None = None) -> List[dict]:
     """
     get execs for a given cycleId and cache them
-    return the executions for this cycle
+    return the executions for this cycle, from the execution index
+    when it is loaded and the numeric cycle_id is given
     """
-    if cycleId in Config.CACHED_TEST_EXECUTIONS:
-        return Config.CACHED_TEST_EXECUTIONS[cycleId]
+    index = Config.THE_EXECUTION_INDEX
+    if index is not None and cycle_id is not None:
+        return index.cycle(cycle_id)
     params = {}
     params["testCycle"] = cycleId
-    tc_execs = get_tc_executions(params)
-    Config.CACHED_TEST_EXECUTIONS[cycleId] = tc_execs
-    return tc_execs
+    return fetch(
+        Config.CACHED_TEST_EXECUTIONS,
+        cycleId,
+        lambda: get_tc_executions(params),
+    )
 
 
 def get_testcase_executions(testCaseId: str) -> list[dict]:
     """
     Get all the test executions and cache them -
     can not get per cycle from the API.
+    Answered from the execution index when it is loaded.
     """
-    if testCaseId in Config.CACHED_TEST_EXECUTIONS:
-        tc_execs = Config.CACHED_TEST_EXECUTIONS[testCaseId]
-        return tc_execs
+    index = Config.THE_EXECUTION_INDEX
+    if index is not None:
+        return index.testcase(testCaseId)
     params = {}
     params["testCase"] = testCaseId
-    tc_execs = get_tc_executions(params)
-    Config.CACHED_TEST_EXECUTIONS[testCaseId] = tc_execs
-    return tc_execs
+    return fetch(
+        Config.CACHED_TEST_EXECUTIONS,
+        testCaseId,
+        lambda: get_tc_executions(params),
+    )
 
 
 def get_tc_executions(params: dict) -> list[dict]:
@@ -647,8 +801,7 @@ def get_tc_executions(params: dict) -> list[dict]:
     params["maxResults"] = str(maxresults)
     tc_execs = []
     burl = paths.CloudPaths.EXECUTIONS
-    zapi = get_zephyr_api().session
-    b4 = zapi.base_url
+    zapi = zephyr_session()
     done = False
     startAt = 0
     while not done:
@@ -658,12 +811,11 @@ def get_tc_executions(params: dict) -> list[dict]:
             done = resp.get("isLast") is True
             if not done:  # should only be one page really
                 burl = resp.get("next")
-                zapi.base_url = ""
+                zapi = zephyr_session(absolute=True)
                 startAt += maxresults
                 params["startAt"] = str(startAt)
             for exec in values:
                 tc_execs.append(fix_json(exec))
-    zapi.base_url = b4
     return tc_execs
 
 
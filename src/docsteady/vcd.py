@@ -27,9 +27,10 @@ import os
 from collections import Counter
 from typing import Any, List
 
-from marshmallow import Schema, fields, pre_load
+from marshmallow import fields, pre_load
 
 from .config import Config
+from .conversion import BatchedSchema, json_default
 from .utils import HtmlPandocField, get_tspec
 
 # Globals
@@ -38,7 +39,7 @@ jpr: dict = {}
 jst: dict = {}
 
 
-class VerificationE(Schema):
+class VerificationE(BatchedSchema):
     key = fields.String(required=True)
     id = fields.String()
     summary = fields.String()
@@ -448,16 +449,16 @@ def build_vcd_dict(
     with open(tcrfile, "w") as fp:
         json.dump(Config.tcresults, fp)
     with open(vcdfile, "w") as fp:
-        json.dump(vcd_dict, fp)
+        json.dump(vcd_dict, fp, default=json_default)
     with open(docfile, "w") as fp:
         json.dump(Config.REQ_PER_DOC, fp)
     with open(reqfile, "w") as fp:
         json.dump(Config.CACHED_REQS_FOR_VES, fp)
     with open(tcasefile, "w") as fp:
-        json.dump(Config.CACHED_TESTCASES, fp)
+        json.dump(Config.CACHED_TESTCASES, fp, default=json_default)
     with open(tcresfile, "w") as fp:
         json.dump(Config.CACHED_TESTRES_SUM, fp)
     with open(f"{path}/ve_model.json", "w") as fp:
-        json.dump(ve_model, fp)
+        json.dump(ve_model, fp, default=json_default)
 
     return vcd_dict
@@ -22,26 +22,57 @@
 Subroutines required to baseline the Verification Elements
 """
 
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable
+
+import arrow
 from marshmallow import EXCLUDE
 from requests import Session
-from urllib3 import Retry
 
+from .cache import fetch
 from .config import Config
-from .cycle import TestCycle
+from .conversion import finish_conversions, json_default
+from .executions import (
+    execution_end,
+    get_latest_execution,
+    get_status_history,
+    load_execution_index,
+)
 from .spec import TestCase
 from .utils import (
     create_folders_and_files,
     fix_json,
+    get_key,
     get_rest_session,
+    get_tc_executions,
     get_testcase_executions,
     get_value,
     get_via_zephyr,
     get_zephyr_api,
+    warm_pointers,
 )
 from .vcd import VerificationE
 
 # for dubuging we do not need the hundreds of verification elements
 FEWCOUNT = 4
+# the levels of the extraction graph, see plan_extraction
+EXTRACTION_LEVELS = ("VEs", "executions", "cycles", "plans", "test cases")
+# Zephyr execution status and the status of a result in the documents,
+# notexec for any other
+RESULT_STATUSES = {
+    "Pass": "passed",
+    "Fail": "failed",
+    "Blocked": "blocked",
+    "Pass w/ Deviation": "cndpass",
+}
 
 
 def get_testcase(tckey: str) -> dict | None:
@@ -58,51 +89,73 @@ def get_testcase(tckey: str) -> dict | None:
 
     # apparently need to get he last execution also ..
     # Zpehyr no longer returns it
-    execs = get_testcase_executions(tckey)
-    if len(execs) >= 1:
-        jtc_res = execs[0]
+    jtc_res = get_latest_execution(tckey)
+    if jtc_res is not None:
         tc_results: dict = dict()
         tc_results["key"] = jtc_res["key"]
-        tc_results["status"] = "notexec"
         status = get_value(jtc_res["testExecutionStatus"])
-        if status == "Pass":
-            tc_results["status"] = "passed"
-        elif status == "Fail":
-            tc_results["status"] = "failed"
-        elif status == "Blocked":
-            tc_results["status"] = "blocked"
-        elif status == "Pass w/ Deviation":
-            tc_results["status"] = "cndpass"
-        if "executionDate" in jtc_res.keys():
-            tc_results["exdate"] = jtc_res["executionDate"][0:10]
-        elif "actualEndDate" in jtc_res.keys():
-            tc_results["exdate"] = jtc_res["actualEndDate"][0:10]
-        test_cycle = None
+        tc_results["status"] = RESULT_STATUSES.get(status, "notexec")
+        # the date the last execution was chosen by
+        ended = execution_end(jtc_res)
+        if ended:
+            tc_results["exdate"] = ended[0:10]
+        plans: list = []
         if "testCycle" in jtc_res and type(jtc_res["testCycle"]) is dict:
-            test_cyclej = get_via_zephyr(jtc_res["testCycle"]["self"])
-            test_cycle = TestCycle(unknown=EXCLUDE).load(fix_json(test_cyclej))
+            test_cycle = get_cycle_summary(jtc_res["testCycle"])
             # now to get the plan should be in the test case but the cycle
             tc_results["tcycle"] = test_cycle["key"]
-        if test_cycle and len(test_cycle["test_plans"]) > 0:
-            zapi = get_zephyr_api()
-            jtp_dets = zapi.test_plans.get_test_plan(
-                test_cycle["test_plans"][0]
-            )
-            if (
-                "customFields" in jtp_dets
-                and "Document ID" in jtp_dets["customFields"].keys()
-            ):
-                tc_results["TPR"] = jtp_dets["customFields"]["Document ID"]
-            else:
-                tc_results["TPR"] = ""
-        else:
-            tc_results["TPR"] = ""
+            plans = test_cycle["test_plans"]
+        tc_results["TPR"] = get_plan_document(plans[0]) if plans else ""
         Config.CACHED_TESTRES_SUM[tckey] = tc_results
         tc_details["lastR"] = tc_results
 
     return tc_details
 
 
+def get_result_history(tckey: str) -> dict[str, int]:
+    """The number of executions of a test case by result status. It is
+    not part of the last result, which is dumped with the model."""
+    history: Counter = Counter()
+    for name, count in get_status_history(tckey).items():
+        history[RESULT_STATUSES.get(name, "notexec")] += count
+    return dict(history)
+
+
+def get_cycle_summary(pointer: dict) -> dict:
+    """The key and test plan ids of the test cycle of an execution, got
+    once per run. Unlike `cycle.TestCycle` nothing is converted."""
+    return fetch(
+        Config.CACHED_CYCLES,
+        str(pointer["id"]),
+        lambda: load_cycle_summary(pointer["self"]),
+    )
+
+
+def load_cycle_summary(url: str) -> dict:
+    test_cycle = get_via_zephyr(url)
+    links = test_cycle.get("links") or {}
+    return dict(
+        key=test_cycle["key"],
+        test_plans=[p["testPlanId"] for p in links.get("testPlans", [])],
+    )
+
+
+def get_plan_document(plan_id: int | str) -> str:
+    """The Document ID of a test plan, "" when it has none, got once per
+    run."""
+    return fetch(
+        Config.CACHED_PLAN_DOCUMENTS,
+        str(plan_id),
+        lambda: load_plan_document(plan_id),
+    )
+
+
+def load_plan_document(plan_id: int | str) -> str:
+    jtp_dets = get_zephyr_api().test_plans.get_test_plan(plan_id)
+    custom_fields = jtp_dets.get("customFields") or {}
+    return custom_fields.get("Document ID") or ""
+
+
 def get_testcases_ve(key: str) -> list[str]:
     "VE key form LVV-NNN"
     zapi = get_zephyr_api()
@@ -114,15 +167,22 @@ def get_testcases_ve(key: str) -> list[str]:
     return tcs
 
 
+def get_ve_testcase_keys(key: str) -> list[str]:
+    return fetch(
+        Config.CACHED_VE_TESTCASES, key, lambda: get_testcases_ve(key)
+    )
+
+
+def get_testcase_cached(tckey: str) -> dict | None:
+    return fetch(Config.CACHED_TESTCASES, tckey, lambda: get_testcase(tckey))
+
+
 def process_test_cases(tcs: list[str], ve_details: dict) -> dict:
     # populate test_cases from raw_test_cases
     if tcs and len(tcs) > 0:
         ve_details["test_cases"] = []
         for tc in tcs:
-            if tc not in Config.CACHED_TESTCASES:
-                Config.CACHED_TESTCASES[tc] = get_testcase(tc)
-
-            ve_details["test_cases"].append(Config.CACHED_TESTCASES[tc])
+            ve_details["test_cases"].append(get_testcase_cached(tc))
     return ve_details
 
 
@@ -135,8 +195,13 @@ def get_ve_details(rs: Session, key: str) -> dict:
     """
     # print(f"get_ve_details {key}", end=".", flush=True)
     ve_res = rs.get(Config.ISSUE_URL.format(issue=key))
-    jve_res = fix_json(ve_res.json())
-    return get_ve_json(jve_res)
+    return load_ve(ve_res.json())
+
+
+def load_ve(jve_res: dict) -> dict:
+    """VE details from the issue as returned by Jira, on its own or in
+    the results of a search for VEs"""
+    return get_ve_json(fix_json(jve_res))
 
 
 def get_ve_json(jve_res: dict) -> dict:
@@ -144,8 +209,7 @@ def get_ve_json(jve_res: dict) -> dict:
     ve_details["summary"] = ve_details["summary"].strip()
     # @post_load is not working
     # populate test_cases from raw_test_cases
-    rs = get_rest_session()
-    tcs = get_testcases_ve(ve_details["key"])
+    tcs = get_ve_testcase_keys(ve_details["key"])
     process_test_cases(tcs, ve_details)
     # populate upper level reqs from raw_upper_reqs
     ve_details["upper_reqs"] = []
@@ -160,7 +224,64 @@ def get_ve_json(jve_res: dict) -> dict:
                 upper = (u_id, u_sum)
                 ve_details["upper_reqs"].append(upper)
 
-    # cache reqs
+    # get component/subcomponent of verified_by
+    if "verified_by" in ve_details.keys():
+        index_components(ve_details["verified_by"].keys())
+        for vby in ve_details["verified_by"].keys():
+            vby_fields = get_components(vby)
+            ve_details["verified_by"][vby]["component"] = vby_fields[
+                "components"
+            ][0]["name"]
+            if "customfield_15001" in vby_fields.keys():
+                if vby_fields["customfield_15001"]:
+                    tmp = vby_fields["customfield_15001"]["value"]
+                    ve_details["verified_by"][vby]["subcomponent"] = tmp
+
+    return ve_details
+
+
+def index_components(keys: Iterable[str]) -> None:
+    """Add the components and sub-component of the issues not in
+    ``Config.CACHED_COMPONENTS`` yet, with a JQL search per
+    ``Config.ISSUE_BATCH_SIZE`` issues."""
+    missing = [
+        key
+        for key in dict.fromkeys(keys)
+        if key not in Config.CACHED_COMPONENTS
+    ]
+    rs = get_rest_session()
+    for start in range(0, len(missing), Config.ISSUE_BATCH_SIZE):
+        chunk = missing[start : start + Config.ISSUE_BATCH_SIZE]
+        params: dict = dict(
+            jql=f"key in ({','.join(chunk)})",
+            fields="components,customfield_15001",
+            maxResults=len(chunk),
+            validateQuery="warn",
+        )
+        result = rs.get(Config.ISSUE_SEARCH_URL, params=params)
+        if result.status_code != 200:
+            continue
+        for issue in result.json().get("issues", []):
+            Config.CACHED_COMPONENTS[issue["key"]] = issue["fields"]
+
+
+def get_components(key: str) -> dict:
+    """The fields with the components and sub-component of an issue.
+    Issues the search did not find, like moved ones, are got on their own.
+    """
+    if key not in Config.CACHED_COMPONENTS:
+        index_components([key])
+    return fetch(Config.CACHED_COMPONENTS, key, lambda: load_components(key))
+
+
+def load_components(key: str) -> dict:
+    rs = get_rest_session()
+    vby_cmp_raw = rs.get(Config.GET_ISSUE_COMPONENT.format(issue=key))
+    return vby_cmp_raw.json()["fields"]
+
+
+def cache_req(ve_details: dict) -> None:
+    """Add the Verification Element to the ones of its requirement."""
     if "req_id" in ve_details.keys():
         if ve_details["req_id"] not in Config.CACHED_REQS_FOR_VES:
             Config.CACHED_REQS_FOR_VES[ve_details["req_id"]] = []
@@ -168,50 +289,165 @@ def get_ve_json(jve_res: dict) -> dict:
             ve_details["key"]
         )
 
-    # get component/subcomponent of verified_by
-    if "verified_by" in ve_details.keys():
-        for vby in ve_details["verified_by"].keys():
-            vby_cmp_raw = rs.get(Config.GET_ISSUE_COMPONENT.format(issue=vby))
-            jvby_cmp_raw = vby_cmp_raw.json()
-            ve_details["verified_by"][vby]["component"] = jvby_cmp_raw[
-                "fields"
-            ]["components"][0]["name"]
-            if "customfield_15001" in jvby_cmp_raw["fields"].keys():
-                if jvby_cmp_raw["fields"]["customfield_15001"]:
-                    tmp = jvby_cmp_raw["fields"]["customfield_15001"]["value"]
-                    ve_details["verified_by"][vby]["subcomponent"] = tmp
-
-    return ve_details
 
+def restore_order(cache: dict, before: set, keys: Iterable[str]) -> None:
+    """Move the entries added to `cache` since it held the keys `before`
+    into the order of `keys`, the order they are added in when extracting
+    one Verification Element at a time."""
+    for key in keys:
+        if key in cache and key not in before:
+            before.add(key)
+            cache[key] = cache.pop(key)
+
+
+def ve_jql(cmp: str, subcmp: str, since: str | None = None) -> str:
+    """The JQL of the search URLs of ``Config`` for the Verification
+    Elements of a component, optionally only those updated since a
+    date in the JQL format."""
+    jql = f'project = {Config.PROJECT} and component = "{cmp}"'
+    if subcmp == "None":
+        jql += " and Sub-Component is null"
+    elif subcmp:
+        jql += f" and Sub-Component = '{subcmp}'"
+    jql += " and issuetype = Verification"
+    if since:
+        jql += f' and updated >= "{since}"'
+    return jql + " ORDER BY key ASC"
+
+
+def list_ve_keys(cmp: str, subcmp: str) -> list[str]:
+    """The keys of all the Verification Elements of a component."""
+    rs = get_rest_session()
+    keys: list[str] = []
+    while True:
+        params: dict = dict(
+            jql=ve_jql(cmp, subcmp),
+            fields="id",
+            maxResults=1000,
+            startAt=len(keys),
+        )
+        result = rs.get(Config.ISSUE_SEARCH_URL, params=params)
+        result.raise_for_status()
+        jresult = result.json()
+        keys.extend(issue["key"] for issue in jresult["issues"])
+        if not jresult["issues"] or len(keys) >= jresult["total"]:
+            return keys
+
+
+def checkpoint_path(component: str, subcomponent: str) -> str:
+    name = re.sub(r"\W+", "_", f"{component}-{subcomponent or 'all'}")
+    return os.path.join(Config.CACHE_DIR, f"ve-checkpoint-{name}.jsonl")
+
+
+class Checkpoint:
+    """Journal of the VEs extracted so far, with their test cases and last
+    results, one line per VE appended as soon as it is complete. Each line
+    starts with the SHA-256 of its JSON, lines that do not match, like one
+    cut short by a crash, are ignored. The VEs of the journal left by an
+    interrupted run are only reused with ``resume``, and not when it is
+    older than ``Config.VE_SNAPSHOT_MAX_AGE``; otherwise it is started
+    again."""
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.done: dict[str, dict] = {}
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except OSError:
+            return
+        if not resume or age > Config.VE_SNAPSHOT_MAX_AGE:
+            if resume:
+                print(f"Not resuming from {path}, it is too old.")
+            os.remove(path)
+            return
+        with open(path) as f:
+            for line in f:
+                digest, _, payload = line.rstrip("\n").partition(" ")
+                if hashlib.sha256(payload.encode()).hexdigest() != digest:
+                    logging.log(logging.WARN, f"Ignoring a line of {path}")
+                    continue
+                entry = json.loads(payload)
+                self.done[entry["ve"]["key"]] = entry
+        print(
+            f"Resuming from {path}: reusing {len(self.done)} VEs extracted "
+            f"{age / 3600:.1f} hours ago."
+        )
 
-def extract_ves(cmp: str, subcmp: str, DOFEW: bool = False) -> dict:
+    def restore(self, key: str) -> dict:
+        """A VE of the journal, its test cases and results put back in the
+        caches."""
+        entry = self.done[key]
+        ve = reuse_ve(entry["ve"], set(), entry["testresults"])
+        cache_req(ve)
+        return ve
+
+    def record(self, ve: dict) -> None:
+        tckeys = [tc["key"] for tc in ve.get("test_cases", []) if tc]
+        entry = dict(
+            ve=ve,
+            testresults={
+                key: Config.CACHED_TESTRES_SUM[key]
+                for key in tckeys
+                if key in Config.CACHED_TESTRES_SUM
+            },
+        )
+        payload = json.dumps(entry, default=json_default)
+        digest = hashlib.sha256(payload.encode()).hexdigest()
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(f"{digest} {payload}\n")
+
+    def remove(self) -> None:
+        """Forget the journal once the extraction is complete."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def extract_ves(
+    cmp: str,
+    subcmp: str,
+    DOFEW: bool = False,
+    since: str | None = None,
+    checkpoint: Checkpoint | None = None,
+) -> dict:
     """
     :param cmp:
     :param subcmp:
+    :param since: only the VEs updated since this JQL date
+    :param checkpoint: journal of the VEs extracted, those already in it
+        are not extracted again
     :return:
     """
     # ve_list = []
     ve_details = dict()
 
-    max = 500
+    max = Config.VE_PAGE_SIZE
     startAt = 0
+    jql = ve_jql(cmp, subcmp, since) if since else ""
     # if T&S component is given, the JQL query needs to be adjusted
     cmp = cmp.replace("&", "%26")
     # if subcomponents have & character, need to be encoded as above
     subcmp = subcmp.replace("&", "%26")
     count = 0
     rs: Session | Session = get_rest_session()
-
-    # Setting retries, sometime the connections fails
-    # https://stackoverflow.com/questions/15431044/can-i-set-max-retries-for-requests-request
-    retries = Retry(
-        total=10, backoff_factor=1, status_forcelist=[500, 502, 503, 504]
-    )
-
-    rs.adapters["max_retries"] = retries  # type: ignore
+    cached_testcases = set(Config.CACHED_TESTCASES)
+    cached_results = set(Config.CACHED_TESTRES_SUM)
+    levels: Counter = Counter()
 
     while True:
-        if subcmp == "":
+        if since:
+            # get the VEs changed since the last extraction
+            params: dict = dict(
+                jql=jql,
+                fields=Config.VE_FIELDS,
+                expand="renderedFields",
+                maxResults=max,
+                startAt=startAt,
+            )
+            result = rs.get(Config.ISSUE_SEARCH_URL, params=params)
+        elif subcmp == "":
             # get all VEs for a given Component
             result = rs.get(
                 Config.VE_COMPONENT_URL.format(
@@ -241,11 +477,37 @@ def extract_ves(cmp: str, subcmp: str, DOFEW: bool = False) -> dict:
             print(jresult["errorMessages"])
             exit(3)
         totals = jresult["total"]
-        for i in jresult["issues"]:
-            ve_details[i["key"]] = get_ve_details(rs, i["key"])
+        # the search returns the whole VEs, no need to get them one by one
+        issues = jresult["issues"]
+        if DOFEW:
+            issues = issues[: FEWCOUNT - count]
+        done = checkpoint.done if checkpoint else {}
+        todo = [issue for issue in issues if issue["key"] not in done]
+        index_components(
+            vby
+            for issue in todo
+            for vby in VerificationE().extract_verified_by(issue["fields"])
+        )
+        levels.update(plan_extraction([issue["key"] for issue in todo]))
+
+        def load(issue: dict) -> dict:
+            ve = load_ve(issue)
+            if checkpoint:
+                checkpoint.record(ve)
+            return ve
+
+        loaded = dict(
+            zip([i["key"] for i in todo], map_concurrently(load, todo))
+        )
+        for issue in issues:
+            key = issue["key"]
+            if key in loaded:
+                ve = loaded[key]
+                cache_req(ve)
+            elif checkpoint:
+                ve = checkpoint.restore(key)
+            ve_details[key] = ve
             count = count + 1
-            if DOFEW and count >= FEWCOUNT:
-                break
         print("")
         startAt = startAt + max
         if startAt > totals:
@@ -255,21 +517,271 @@ def extract_ves(cmp: str, subcmp: str, DOFEW: bool = False) -> dict:
             if DOFEW and count >= FEWCOUNT:
                 break
 
+    print(
+        "Extraction graph: "
+        + ", ".join(
+            f"{levels[level]} {level} ({levels[level + ' new']} new)"
+            for level in EXTRACTION_LEVELS
+        )
+    )
+    # as if extracted one at a time
+    testcases = [
+        tc["key"]
+        for ve in ve_details.values()
+        for tc in ve.get("test_cases", [])
+    ]
+    restore_order(Config.CACHED_TESTCASES, cached_testcases, testcases)
+    restore_order(Config.CACHED_TESTRES_SUM, cached_results, testcases)
     return ve_details
 
 
+def plan_extraction(ve_keys: list[str]) -> Counter:
+    """Get what the VEs lead to breadth first, before assembling them: the
+    test case keys of the VEs, then the executions of those test cases,
+    the cycles of their last executions, the plans of those cycles and
+    last the test cases. At each level the keys found are deduplicated,
+    those not cached yet are got concurrently. Returns the number of
+    entities found, and got as ``<level> new``, at each of
+    ``EXTRACTION_LEVELS``."""
+    sizes: Counter = Counter()
+
+    def level(name: str, keys: list, cache: dict, get: Callable) -> list:
+        keys = list(dict.fromkeys(keys))
+        missing = [key for key in keys if key not in cache]
+        sizes[name] += len(keys)
+        sizes[f"{name} new"] += len(missing)
+        map_concurrently(get, missing)
+        return keys
+
+    ve_keys = level(
+        "VEs", ve_keys, Config.CACHED_VE_TESTCASES, get_ve_testcase_keys
+    )
+    tckeys = [tc for key in ve_keys for tc in get_ve_testcase_keys(key)]
+    index = Config.THE_EXECUTION_INDEX
+    tckeys = level(
+        "executions",
+        tckeys,
+        index.by_testcase if index else Config.CACHED_TEST_EXECUTIONS,
+        get_testcase_executions,
+    )
+    pointers = {}
+    for tckey in tckeys:
+        execution = get_latest_execution(tckey)
+        if execution and isinstance(execution.get("testCycle"), dict):
+            pointers[str(execution["testCycle"]["id"])] = execution[
+                "testCycle"
+            ]
+    level(
+        "cycles",
+        list(pointers),
+        Config.CACHED_CYCLES,
+        lambda cycle_id: get_cycle_summary(pointers[cycle_id]),
+    )
+    summaries = [get_cycle_summary(pointer) for pointer in pointers.values()]
+    plans = [
+        str(summary["test_plans"][0])
+        for summary in summaries
+        if summary["test_plans"]
+    ]
+    level("plans", plans, Config.CACHED_PLAN_DOCUMENTS, get_plan_document)
+    # the cycles and plans of their results are cached now
+    level("test cases", tckeys, Config.CACHED_TESTCASES, get_testcase_cached)
+    logging.log(
+        logging.INFO,
+        ", ".join(f"{size} {name}" for name, size in sizes.items()),
+    )
+    return sizes
+
+
+def map_concurrently(function: Callable[[Any], Any], items: list) -> list:
+    """`function` applied to each item, in up to ``Config.CONCURRENCY``
+    threads. Results are in the order of the items."""
+    if Config.CONCURRENCY <= 1:
+        return [function(item) for item in items]
+    # create the shared Zephyr session before the threads use it
+    get_zephyr_api()
+    with ThreadPoolExecutor(max_workers=Config.CONCURRENCY) as pool:
+        return list(pool.map(function, items))
+
+
+def snapshot_path(component: str, subcomponent: str) -> str:
+    name = re.sub(r"\W+", "_", f"{component}-{subcomponent or 'all'}")
+    return os.path.join(Config.CACHE_DIR, f"ve-snapshot-{name}.json")
+
+
+def load_snapshot(path: str) -> dict | None:
+    """The VEs of the last incremental extraction, None if there is none
+    or the full extraction it started from is older than
+    ``Config.VE_SNAPSHOT_MAX_AGE``."""
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.log(logging.WARN, f"Ignoring VE snapshot {path}: {e}")
+        return None
+    # snapshots written before full extractions were recorded
+    snapshot.setdefault("built", snapshot["extracted"])
+    age = arrow.utcnow() - arrow.get(snapshot["built"])
+    if age.total_seconds() > Config.VE_SNAPSHOT_MAX_AGE:
+        print(
+            f"The last full extraction is {age.days} days old, "
+            "extracting all VEs."
+        )
+        return None
+    return snapshot
+
+
+def save_snapshot(
+    path: str,
+    extracted: arrow.Arrow,
+    built: str,
+    ves: dict,
+    versions: dict[str, str],
+) -> None:
+    tckeys = {
+        tc["key"] for ve in ves.values() for tc in ve.get("test_cases", [])
+    }
+    snapshot = dict(
+        extracted=extracted.isoformat(),
+        built=built,
+        ves=ves,
+        testresults={
+            key: value
+            for key, value in Config.CACHED_TESTRES_SUM.items()
+            if key in tckeys
+        },
+        versions={
+            key: value for key, value in versions.items() if key in tckeys
+        },
+    )
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(snapshot, f, default=json_default)
+    os.replace(f"{path}.tmp", path)
+
+
+def executed_testcases(since: arrow.Arrow) -> set[str]:
+    """The keys of the test cases with an execution ended since."""
+    index = Config.THE_EXECUTION_INDEX
+    if index is not None:
+        return index.ended_since(since)
+    execs = get_tc_executions(
+        {
+            "projectKey": Config.PROJECT,
+            "actualEndDateAfter": since.format("YYYY-MM-DDTHH:mm:ss") + "Z",
+        }
+    )
+    return {
+        get_key(e["testCase"])
+        for e in execs
+        if isinstance(e.get("testCase"), dict)
+    }
+
+
+def get_tc_versions() -> dict[str, str]:
+    """A digest of each test case of ``Config.PROJECT`` as Zephyr lists
+    them, a thousand a page. Zephyr Cloud gives no updatedOn for test
+    cases, the digest changes when any of their fields is edited."""
+    zapi = get_zephyr_api()
+    versions = {}
+    for tc in zapi.test_cases.get_test_cases(
+        projectKey=Config.PROJECT, maxResults=1000
+    ):
+        text = json.dumps(tc, sort_keys=True)
+        versions[tc["key"]] = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return versions
+
+
+def edited_testcases(snapshot: dict, versions: dict[str, str]) -> set[str]:
+    """The keys of the test cases whose digest is not the one saved with
+    the snapshot."""
+    saved = snapshot.get("versions", {})
+    return {key for key, value in versions.items() if saved.get(key) != value}
+
+
+def reuse_ve(ve: dict, stale: set[str], results: dict) -> dict:
+    """A VE of the snapshot with the stale test cases got again and the
+    others put back in the caches."""
+    for i, tc in enumerate(ve.get("test_cases", [])):
+        key = tc["key"]
+        if key in stale:
+            tc = fetch(Config.CACHED_TESTCASES, key, lambda: get_testcase(key))
+        else:
+            tc = fetch(Config.CACHED_TESTCASES, key, lambda: tc)
+            if key in results and key not in Config.CACHED_TESTRES_SUM:
+                Config.CACHED_TESTRES_SUM[key] = results[key]
+        ve["test_cases"][i] = tc
+    return ve
+
+
+def refresh_ves(
+    cmp: str, subcmp: str, snapshot: dict, versions: dict[str, str]
+) -> dict:
+    """The VEs of the snapshot with those updated since it was taken
+    extracted again. VEs no longer in the component are dropped, test
+    cases with new executions or not at the version of the snapshot,
+    see `get_tc_versions`, are got again."""
+    since = arrow.get(snapshot["extracted"]).shift(
+        seconds=-Config.VE_REFRESH_MARGIN
+    )
+    jql_since = since.to(Config.TIMEZONE).format("YYYY/MM/DD HH:mm")
+    changed = extract_ves(cmp, subcmp, since=jql_since)
+    executed = executed_testcases(since)
+    edited = edited_testcases(snapshot, versions)
+    print(
+        f"{len(changed)} Verification Elements updated, "
+        f"{len(executed)} test cases executed and {len(edited)} edited "
+        f"since {since}."
+    )
+    ves = {}
+    for key in list_ve_keys(cmp, subcmp):
+        if key in changed:
+            ves[key] = changed[key]
+        elif key in snapshot["ves"]:
+            ves[key] = reuse_ve(
+                snapshot["ves"][key],
+                executed | edited,
+                snapshot["testresults"],
+            )
+        else:
+            # added to the component after the search for changes
+            ves[key] = get_ve_details(get_rest_session(), key)
+    # as if extracted all at once
+    Config.CACHED_REQS_FOR_VES.clear()
+    for ve in ves.values():
+        cache_req(ve)
+    testcases = [
+        tc["key"] for ve in ves.values() for tc in ve.get("test_cases", [])
+    ]
+    restore_order(Config.CACHED_TESTCASES, set(), testcases)
+    restore_order(Config.CACHED_TESTRES_SUM, set(), testcases)
+    return ves
+
+
 def do_ve_model(
-    component: str, subcomponent: str, DOFEW: bool = False
+    component: str,
+    subcomponent: str,
+    DOFEW: bool = False,
+    incremental: bool = False,
+    resume: bool = False,
 ) -> dict:
     """
     Extract VE model information from Jira, Zephyr
     :param component:
     :param subcomponent:
     :param DOFEW:  mainly for testing - jsut get some VEs not all
+    :param incremental: only extract the VEs changed since the last
+        incremental extraction, kept in ``Config.CACHE_DIR``. Test steps
+        and executions edited or deleted since are only seen by the full
+        extraction done every ``Config.VE_SNAPSHOT_MAX_AGE``
+    :param resume: reuse the VEs extracted by an interrupted extraction
     :return:
     """
     # create folders for images and attachments if not already there
     create_folders_and_files()
+    warm_pointers()
 
     print(
         f"Looking for all Verification Elements in component '{component}', "
@@ -277,7 +789,33 @@ def do_ve_model(
     )
 
     # get all VEs details
-    ves = extract_ves(component, subcomponent, DOFEW)
+    snapshot = None
+    if incremental:
+        path = snapshot_path(component, subcomponent)
+        snapshot = load_snapshot(path)
+        started = arrow.utcnow()
+        # before the extraction, an edit made during it is seen next time
+        versions = get_tc_versions()
+    if not DOFEW:
+        # one paged search instead of one per test case
+        load_execution_index(incremental)
+    if snapshot:
+        ves = refresh_ves(component, subcomponent, snapshot, versions)
+    else:
+        checkpoint = None
+        if Config.VE_CHECKPOINT and not DOFEW:
+            checkpoint = Checkpoint(
+                checkpoint_path(component, subcomponent), resume
+            )
+        ves = extract_ves(
+            component, subcomponent, DOFEW, checkpoint=checkpoint
+        )
+        if checkpoint:
+            checkpoint.remove()
+    if incremental:
+        finish_conversions()
+        built = snapshot["built"] if snapshot else started.isoformat()
+        save_snapshot(path, started, built, ves, versions)
 
     if DOFEW:
         print(f" Only doing (DOFEW={DOFEW}) {len(ves)} Verification Elements.")
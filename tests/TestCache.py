@@ -0,0 +1,61 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from docsteady.cache import Cache, fetch
+
+
+class TestCache(unittest.TestCase):
+    def test_single_flight(self) -> None:
+        cache = Cache("test")
+        loads = []
+        started = threading.Event()
+
+        def load() -> str:
+            loads.append(1)
+            started.set()
+            time.sleep(0.05)
+            return "value"
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            first = pool.submit(cache.fetch, "key", load)
+            started.wait()
+            others = [pool.submit(cache.fetch, "key", load) for _ in range(3)]
+            values = [first.result()] + [f.result() for f in others]
+        self.assertEqual(["value"] * 4, values)
+        self.assertEqual(1, len(loads))
+        self.assertEqual(1, cache.stats["miss"])
+        self.assertEqual(3, cache.stats["wait"] + cache.stats["hit"])
+
+    def test_failures(self) -> None:
+        cache = Cache("test")
+
+        def fail() -> str:
+            raise KeyError("gone")
+
+        with self.assertRaises(KeyError):
+            cache.fetch("key", fail)
+        # a failed or empty load is tried again
+        self.assertIsNone(cache.fetch("key", lambda: None))
+        self.assertEqual("value", cache.fetch("key", lambda: "value"))
+        # a load needing its own key loads it again instead of waiting
+        self.assertEqual(
+            "xx", cache.fetch("x", lambda: fetch(cache, "x", str) + "xx")
+        )
+        self.assertEqual("xx", cache["x"])
+
+    def test_bounds(self) -> None:
+        cache = Cache("test", max_entries=2)
+        for key in "abc":
+            cache.fetch(key, key.upper)
+        self.assertEqual(["b", "c"], list(cache))
+        cache.fetch("b", str)
+        cache["d"] = "D"
+        self.assertEqual({"b": "B", "d": "D"}, cache)
+
+    def test_plain_dict(self) -> None:
+        cache: dict = {"a": "A"}
+        self.assertEqual("A", fetch(cache, "a", str))
+        self.assertEqual("B", fetch(cache, "b", lambda: "B"))
+        self.assertEqual({"a": "A", "b": "B"}, cache)
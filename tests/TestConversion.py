@@ -0,0 +1,172 @@
+import json
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pypandoc
+import requests
+
+from docsteady.backends import BatchedBackend, ServerBackend, SubprocessBackend
+from docsteady.config import Config
+from docsteady.conversion import (
+    ConversionCache,
+    PendingConversion,
+    conversion_batch,
+    convert,
+    convert_fragments,
+    convert_texts,
+    finish_conversions,
+    json_default,
+)
+
+
+class TestConversion(unittest.TestCase):
+    def test_batch_matches_single(self) -> None:
+        fragments = [
+            "Pass",
+            "<p>a &amp; b</p><p>c_d 50%</p>",
+            "<b>unclosed bold",
+            "tail <br/>end",
+            "",
+            "<ol><li>a</li></ol>",
+            # an unclosed verbatim block swallows the following separator
+            "<pre>never closed",
+            "LDM-503 after the verbatim",
+        ]
+        single = [
+            pypandoc.convert_text(f, "latex", format="html") for f in fragments
+        ]
+        self.assertEqual(single, convert_fragments(fragments, "html", "latex"))
+
+    def test_batch_markdown(self) -> None:
+        fragments = ["[markdown]: #\n*one*", "```\nnot closed", "two"]
+        single = [
+            pypandoc.convert_text(f, "latex", format="gfm") for f in fragments
+        ]
+        self.assertEqual(single, convert_fragments(fragments, "gfm", "latex"))
+
+    def test_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ConversionCache(f"{tmp}/conversions.sqlite", 10000)
+            with mock.patch.object(Config, "THE_CONVERSION_CACHE", cache):
+                first = convert_texts(
+                    ["<p>a</p>", "<i>b</i>"], "html", "latex"
+                )
+                with mock.patch("pypandoc.convert_text") as pandoc:
+                    again = convert_texts(
+                        ["<i>b</i>", "<p>a</p>"], "html", "latex"
+                    )
+                    pandoc.assert_not_called()
+            self.assertEqual(first, again[::-1])
+            # a small cache keeps only the most recently used entries
+            cache.max_bytes = 5
+            cache.put_many({"new": "1234"})
+            self.assertEqual({"new": "1234"}, cache.get_many(["new"]))
+            self.assertEqual({}, cache.get_many(cache_keys(cache)))
+
+    def test_parallel(self) -> None:
+        fragments = [f"<p>item <u>{i}</u></p>" for i in range(6)]
+        with mock.patch.multiple(
+            Config, JOBS=2, CONVERSION_CACHE=False
+        ), mock.patch("docsteady.conversion.MIN_CHUNK", 2):
+            with conversion_batch() as batch:
+                model = {"items": [convert(f, "html", str) for f in fragments]}
+                batch.track(model)
+            finish_conversions()
+            assert Config.THE_CONVERSION_EXECUTOR is not None
+            Config.THE_CONVERSION_EXECUTOR.shutdown()
+            Config.THE_CONVERSION_EXECUTOR = None
+        single = [
+            pypandoc.convert_text(f, "latex", format="html") for f in fragments
+        ]
+        self.assertEqual(single, model["items"])
+        self.assertTrue(all(isinstance(v, str) for v in model["items"]))
+
+    def test_threads(self) -> None:
+        """Each thread converts the models it loads with its own batch."""
+
+        def load(i: int) -> dict:
+            with conversion_batch() as batch:
+                model = {"item": convert(f"<u>{i}</u>", "html", str)}
+                batch.track(model)
+            return model
+
+        with mock.patch.object(Config, "CONVERSION_CACHE", False):
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                models = list(pool.map(load, range(8)))
+        self.assertEqual(
+            [f"\\ul{{{i}}}\n" for i in range(8)],
+            [model["item"] for model in models],
+        )
+
+
+def cache_keys(cache: ConversionCache) -> list[str]:
+    return [
+        cache.key(text, "html", "latex") for text in ("<p>a</p>", "<i>b</i>")
+    ]
+
+
+class TestLazyConversion(unittest.TestCase):
+    def test_lazy(self) -> None:
+        with mock.patch.multiple(
+            Config, LAZY_CONVERSION=True, CONVERSION_CACHE=False
+        ):
+            first = convert("<span>one</span>", "html", str.strip, "objective")
+            second = convert("<u>two</u>", "html", str.strip, "objective")
+            other = convert("<span>three</span>", "html", str.strip, "name")
+            with mock.patch(
+                "pypandoc.convert_text", wraps=pypandoc.convert_text
+            ) as pandoc:
+                self.assertEqual("{one}", f"{first}")
+                self.assertEqual("\\ul{two}", second)
+                pandoc.assert_called_once()
+            self.assertTrue(isinstance(other, PendingConversion))
+            self.assertEqual(
+                '["{one}", "{three}"]',
+                json.dumps([first, other], default=json_default),
+            )
+
+
+class TestBackends(unittest.TestCase):
+    def test_subprocess(self) -> None:
+        fragments = ["<p>a</p>", "<pre>never closed", "b_c"]
+        self.assertEqual(
+            BatchedBackend().convert(fragments, "html", "latex"),
+            SubprocessBackend().convert(fragments, "html", "latex"),
+        )
+
+    def test_isolated(self) -> None:
+        """Fragments do not share heading identifiers nor link
+        references."""
+        cases = [
+            (["<h2>Notes</h2><p>a</p>", "<p>x</p>", "<h2>Notes</h2>"], "html"),
+            (["[a]: http://x.com\n\nfoo", "see [a]", "# Notes"], "gfm"),
+            (["# Notes", "plain", "Notes\n=====", "[^1]: note"], "gfm"),
+        ]
+        for fragments, source_format in cases:
+            self.assertEqual(
+                SubprocessBackend().convert(fragments, source_format, "latex"),
+                BatchedBackend().convert(fragments, source_format, "latex"),
+            )
+
+    def test_server(self) -> None:
+        backend = ServerBackend("http://localhost:3030")
+        reply = mock.Mock(status_code=200)
+        reply.json.return_value = [
+            {"output": "\\textbf{a}", "base64": False, "messages": []},
+            {"output": "b\n", "base64": False, "messages": []},
+        ]
+        with mock.patch.object(
+            requests.Session, "post", return_value=reply
+        ) as post:
+            self.assertEqual(
+                ["\\textbf{a}\n", "b\n"],
+                backend.convert(["<b>a</b>", "b"], "html", "latex"),
+            )
+        post.assert_called_once()
+        self.assertEqual("http://localhost:3030/batch", post.call_args[0][0])
+        self.assertEqual(
+            {"text": "b", "from": "html", "to": "latex"},
+            post.call_args[1]["json"][1],
+        )
@@ -0,0 +1,115 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import arrow
+from DocsteadyTestUtils import read_test_data
+
+from docsteady.config import Config
+from docsteady.executions import (
+    ExecutionIndex,
+    get_status_history,
+    latest_execution,
+    load_execution_index,
+)
+from docsteady.utils import get_execs, get_testcase_executions
+
+
+def executions() -> list[dict]:
+    return [e for es in read_test_data("TEST-EXECUTIONS").values() for e in es]
+
+
+class TestExecutions(unittest.TestCase):
+    def test_index(self) -> None:
+        data = read_test_data("TEST-EXECUTIONS")
+        index = ExecutionIndex("LVV", executions=executions())
+        for cycle_id, execs in data.items():
+            self.assertEqual(execs, index.cycle(int(cycle_id)))
+        first = data["27531072"][0]
+        tcs = index.testcase("LVV-T2338")
+        self.assertIn(first, tcs)
+        self.assertEqual(
+            sum(len(es) for es in data.values()),
+            sum(len(es) for es in index.by_testcase.values()),
+        )
+        self.assertEqual([], index.testcase("LVV-T0"))
+        ended = arrow.get(first["actualEndDate"])
+        self.assertIn("LVV-T2338", index.ended_since(ended))
+        self.assertEqual(set(), index.ended_since(arrow.utcnow()))
+
+    def test_latest(self) -> None:
+        def execution(id: int, tc: str, ended: str, status: str) -> dict:
+            return {
+                "id": id,
+                "key": f"LVV-E{id}",
+                "testCase": {"self": f"{Config.ATM_API}testcases/{tc}"},
+                "actualEndDate": ended,
+                "testExecutionStatus": {"self": status},
+            }
+
+        execs = [
+            execution(1, "LVV-T1", "2024-05-01T10:00:00Z", "Fail"),
+            execution(2, "LVV-T1", "2024-06-01T10:00:00Z", "Pass"),
+            execution(3, "LVV-T1", "2024-04-01T10:00:00Z", "Fail"),
+            execution(4, "LVV-T2", "None", "Not Executed"),
+            execution(5, "LVV-T2", "2023-01-01T00:00:00Z", "Blocked"),
+        ]
+        index = ExecutionIndex("LVV", executions=execs)
+        self.assertEqual({"Fail": 2, "Pass": 1}, index.status_counts("LVV-T1"))
+        self.assertEqual(execs[1], index.latest_execution("LVV-T1"))
+        self.assertEqual(execs[4], index.latest_execution("LVV-T2"))
+        self.assertEqual(execs[1], latest_execution(index.testcase("LVV-T1")))
+        self.assertIsNone(latest_execution([]))
+        with mock.patch.object(
+            Config, "THE_EXECUTION_INDEX", index
+        ), mock.patch.dict(
+            Config.CACHED_POINTERS, {s: s for s in ("Fail", "Pass")}
+        ):
+            self.assertEqual(
+                {"Fail": 2, "Pass": 1}, get_status_history("LVV-T1")
+            )
+
+    def test_lookups(self) -> None:
+        index = ExecutionIndex("LVV", executions=executions())
+        with mock.patch.object(
+            Config, "THE_EXECUTION_INDEX", index
+        ), mock.patch("docsteady.utils.get_tc_executions") as paged:
+            self.assertEqual(
+                index.testcase("LVV-T2338"),
+                get_testcase_executions("LVV-T2338"),
+            )
+            self.assertEqual(
+                index.cycle(27531072), get_execs("LVV-R181", 27531072)
+            )
+            paged.assert_not_called()
+
+    def test_incremental(self) -> None:
+        old, new = executions()[:2], executions()[2:4]
+        changed = dict(old[0], comment="again")
+        with tempfile.TemporaryDirectory() as cache_dir, mock.patch.multiple(
+            Config, CACHE_DIR=cache_dir, THE_EXECUTION_INDEX=None
+        ), mock.patch(
+            "docsteady.executions.get_tc_executions"
+        ) as paged, mock.patch(
+            "builtins.print"
+        ):
+            paged.return_value = old
+            load_execution_index(incremental=True)
+            self.assertEqual({"projectKey": "LVV"}, paged.call_args[0][0])
+            paged.return_value = new + [changed]
+            index = load_execution_index(incremental=True)
+            self.assertIn("actualEndDateAfter", paged.call_args[0][0])
+            self.assertIs(index, Config.THE_EXECUTION_INDEX)
+            self.assertEqual(
+                [e["id"] for e in old + new], list(index.executions)
+            )
+            self.assertEqual(
+                "again", index.executions[old[0]["id"]]["comment"]
+            )
+            # all got again once the last full build is too old
+            built = arrow.get(str(index.built))
+            later = built.shift(seconds=Config.VE_SNAPSHOT_MAX_AGE + 1)
+            with mock.patch("arrow.utcnow", return_value=later):
+                index = load_execution_index(incremental=True)
+            self.assertEqual({"projectKey": "LVV"}, paged.call_args[0][0])
+            self.assertEqual(later.isoformat(), index.built)
@@ -0,0 +1,106 @@
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from docsteady.config import Config
+from docsteady.httpcache import HttpCache, time_to_live
+from docsteady.utils import pooled_session
+
+
+def reply(
+    status: int, body: bytes = b"", etag: bool = True
+) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    if etag:
+        response.headers["ETag"] = '"v1"'
+    response._content = body
+    return response
+
+
+class TestHttpCache(unittest.TestCase):
+    def test_modes(self) -> None:
+        url = "https://jira.example/rest/api/3/issue/LVV-1"
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.multiple(
+            Config,
+            THE_HTTP_CACHE=HttpCache(f"{tmp}/responses.sqlite", 10**6),
+            HTTP_CACHE_MODE="use",
+        ), mock.patch.object(HTTPAdapter, "send") as send:
+            rs = pooled_session()
+            send.return_value = reply(200, b'{"key": "LVV-1"}')
+            self.assertEqual("LVV-1", rs.get(url).json()["key"])
+            # fresh, the server is not asked
+            self.assertEqual("LVV-1", rs.get(url).json()["key"])
+            send.assert_called_once()
+            # stale, the server says it did not change
+            send.return_value = reply(304)
+            with mock.patch("time.time", return_value=time.time() + 3600):
+                self.assertEqual("LVV-1", rs.get(url).json()["key"])
+            request = send.call_args[0][0]
+            self.assertEqual('"v1"', request.headers["If-None-Match"])
+            # refresh always asks the server
+            Config.HTTP_CACHE_MODE = "refresh"
+            send.return_value = reply(200, b'{"key": "LVV-2"}')
+            self.assertEqual("LVV-2", rs.get(url).json()["key"])
+            self.assertEqual(3, send.call_count)
+            # offline never does
+            Config.HTTP_CACHE_MODE = "offline"
+            self.assertEqual("LVV-2", rs.get(url).json()["key"])
+            with self.assertRaises(requests.ConnectionError):
+                rs.get(f"{url}0")
+            self.assertEqual(3, send.call_count)
+
+    def test_refresh(self) -> None:
+        url = "https://jira.example/rest/api/3/issue/LVV-1"
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = HttpCache(f"{tmp}/responses.sqlite", 10**6)
+            with mock.patch.multiple(
+                Config, THE_HTTP_CACHE=cache, HTTP_CACHE_MODE="refresh"
+            ), mock.patch.object(HTTPAdapter, "send") as send:
+                rs = pooled_session()
+                # nothing to revalidate it with, not kept
+                send.return_value = reply(200, b"{}", etag=False)
+                rs.get(url)
+                self.assertEqual(0, cache.total)
+                send.return_value = reply(200, b"{}")
+                rs.get(url)
+                self.assertEqual(2, cache.total)
+
+    def test_iter_content(self) -> None:
+        url = "https://jira.example/images/logo.png"
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.multiple(
+            Config,
+            THE_HTTP_CACHE=HttpCache(f"{tmp}/responses.sqlite", 10**6),
+            HTTP_CACHE_MODE="use",
+        ), mock.patch.object(HTTPAdapter, "send") as send:
+            rs = pooled_session()
+            send.return_value = reply(200, b"line 1\nline 2")
+            rs.get(url)
+            hit = rs.get(url)
+            send.assert_called_once()
+            self.assertEqual(b"line 1\nline 2", b"".join(hit.iter_content(4)))
+            self.assertEqual([b"line 1", b"line 2"], list(hit.iter_lines()))
+
+    def test_time_to_live(self) -> None:
+        with mock.patch.multiple(
+            Config, HTTP_CACHE_TTL=10, HTTP_CACHE_TTLS={"/statuses": 99}
+        ):
+            self.assertEqual(99, time_to_live(f"{Config.ATM_API}statuses/1"))
+            self.assertEqual(10, time_to_live(f"{Config.ATM_API}testcases"))
+
+    def test_eviction(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = HttpCache(f"{tmp}/responses.sqlite", 25)
+            for key in "abc":
+                cache.put(key, key, reply(200, b"x" * 10))
+                time.sleep(0.01)
+            # the least recently used go first
+            self.assertIsNone(cache.get("a"))
+            self.assertIsNotNone(cache.get("c"))
+            self.assertLessEqual(cache.total, 25)
+            reopened = HttpCache(f"{tmp}/responses.sqlite", 25)
+            self.assertEqual(cache.total, reopened.total)
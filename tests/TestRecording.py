@@ -0,0 +1,51 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from docsteady.config import Config
+from docsteady.recording import start_recording
+from docsteady.utils import pooled_session
+
+
+def reply(status: int, body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.headers["Content-Type"] = "application/json"
+    response.headers["Set-Cookie"] = "session=secret"
+    response._content = body
+    return response
+
+
+class TestRecording(unittest.TestCase):
+    def test_record_replay(self) -> None:
+        url = "https://api.zephyrscale.smartbear.com/v2/testcases/LVV-T1"
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.multiple(
+            Config,
+            HTTP_CACHE_MODE="refresh",
+            THE_LIMITERS={},
+            THE_RECORDING=None,
+        ), mock.patch("atexit.register"):
+            archive = f"{tmp}/run.jsonl.gz"
+            with mock.patch.object(HTTPAdapter, "send") as send:
+                send.side_effect = [
+                    reply(200, b'{"key": "LVV-T1"}'),
+                    reply(201, b'{"id": 5}'),
+                ]
+                recording = start_recording(archive)
+                rs = pooled_session({"Authorization": "Bearer secret"})
+                rs.get(url)
+                rs.post(url, json={"a": 1})
+                recording.save()
+            with mock.patch.object(HTTPAdapter, "send") as send:
+                start_recording(archive, replay=True)
+                rs = pooled_session()
+                self.assertEqual("LVV-T1", rs.get(url).json()["key"])
+                self.assertEqual(5, rs.post(url, json={"a": 1}).json()["id"])
+                with self.assertRaises(requests.ConnectionError):
+                    rs.post(url, json={"a": 2})
+                send.assert_not_called()
+            with open(archive, "rb") as f:
+                self.assertNotIn(b"secret", f.read())
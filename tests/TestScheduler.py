@@ -0,0 +1,79 @@
+import io
+import time
+import unittest
+from unittest import mock
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from docsteady.config import Config
+from docsteady.scheduler import HostLimiter, retry_after
+from docsteady.utils import pooled_session
+
+
+def reply(status: int, **headers: str) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers)
+    response._content = b"{}"
+    response.raw = io.BytesIO()
+    return response
+
+
+class TestScheduler(unittest.TestCase):
+    def test_limiter(self) -> None:
+        limiter = HostLimiter(rate=0, burst=1, max_concurrency=4)
+        limiter.acquire()
+        limiter.release(429, retry_after=60)
+        self.assertEqual(2, limiter.limit)
+        self.assertGreater(limiter.paused_until, time.monotonic() + 50)
+        limiter.paused_until = 0
+        # one more request in flight per round of successful requests
+        for _ in range(2):
+            limiter.acquire()
+            limiter.release(200)
+        self.assertAlmostEqual(2.9, limiter.limit)
+        for _ in range(10):
+            limiter.acquire()
+            limiter.release(200)
+        self.assertEqual(4, limiter.limit)
+
+    def test_bucket(self) -> None:
+        limiter = HostLimiter(rate=100, burst=2, max_concurrency=4)
+        start = time.monotonic()
+        for _ in range(4):
+            limiter.acquire()
+        # two from the burst, two more refilled at 100 per second
+        self.assertGreater(time.monotonic() - start, 0.015)
+        self.assertEqual(4, limiter.in_flight)
+
+    def test_retry(self) -> None:
+        url = "https://jira.example/rest/api/3/search"
+        with mock.patch.multiple(
+            Config, HTTP_CACHE_MODE="refresh", THE_LIMITERS={}
+        ), mock.patch.object(HTTPAdapter, "send") as send, mock.patch(
+            "time.sleep"
+        ) as sleep:
+            # posts are not retried
+            send.return_value = reply(429)
+            self.assertEqual(429, pooled_session().post(url).status_code)
+            send.side_effect = [
+                reply(429, **{"Retry-After": "0.01"}),
+                reply(200),
+            ]
+            self.assertEqual(200, pooled_session().get(url).status_code)
+            sleep.assert_called_once_with(0.01)
+            limiter = Config.THE_LIMITERS["jira.example"]
+            self.assertEqual(0, limiter.in_flight)
+            self.assertLess(limiter.limit, Config.HTTP_POOL_SIZE)
+
+    def test_retry_after(self) -> None:
+        self.assertEqual(5, retry_after(reply(429, **{"Retry-After": "5"})))
+        with self.assertLogs(level="WARN"):
+            self.assertEqual(
+                Config.HTTP_MAX_RETRY_AFTER,
+                retry_after(reply(429, **{"Retry-After": "86400"})),
+            )
+        date = "Wed, 21 Oct 2015 07:28:00 GMT"
+        self.assertEqual(0, retry_after(reply(503, **{"Retry-After": date})))
+        self.assertIsNone(retry_after(reply(503)))
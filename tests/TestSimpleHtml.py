@@ -0,0 +1,97 @@
+import glob
+import json
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import pypandoc
+
+from docsteady.simplehtml import html_to_latex
+
+# Fragments around the edges of the subset converted without pandoc
+FRAGMENTS = [
+    "Pass",
+    "",
+    "  lead  trail  ",
+    "<p>a &amp; b</p><p>c_d 50% $5 #3 {x} ~ ^ \\ | [1]</p>",
+    "it's ‘quoted’ “twice” – and — a--b ... … &nbsp;x",
+    "~a ~. \\x <3 a < b <= c",
+    "a<br/>b<br>",
+    "a <br/> b",
+    "<b>x </b>y <i> z</i>",
+    "<strong>bold</strong> <em>italic</em> <code>a  b--c 'q' `t`</code>",
+    "<em>a <strong>b</strong></em>",
+    "<a href='http://x.org/a_b%20c#d'>link</a>",
+    "<a href='http://x.org/'>http://x.org/</a>",
+    "text<p>para</p>more",
+    "<ul><li>a</li><li>b <b>c</b></li></ul>",
+    "<ol>\n<li>a<br/>b</li>\n</ol>tail",
+    "word " * 40,
+    "<ul><li>" + "word " * 40 + "</li></ul>",
+    "!`t` ?‘s’",
+]
+
+# Fragments pandoc must convert
+UNSUPPORTED = [
+    "<h1>title</h1>",
+    "<p style='color: red'>styled</p>",
+    "<b>unclosed bold",
+    "<br/>leading break",
+    "x<br/><br/>y",
+    "<code>a</code><br/>b",
+    "<b>a</b><b>b</b>",
+    "<ul><li><ul><li>nested</li></ul></li></ul>",
+    "a <unknown",
+    "&#3;",
+    "‘‘",
+]
+
+
+class TestSimpleHtml(unittest.TestCase):
+    def test_fragments(self) -> None:
+        for fragment in FRAGMENTS:
+            with self.subTest(fragment=fragment):
+                self.assertEqual(
+                    pypandoc.convert_text(fragment, "latex", format="html"),
+                    html_to_latex(fragment),
+                )
+
+    def test_unsupported(self) -> None:
+        for fragment in UNSUPPORTED:
+            with self.subTest(fragment=fragment):
+                self.assertIsNone(html_to_latex(fragment))
+
+    def test_conformance(self) -> None:
+        """Every string in the test data converted without pandoc must
+        convert the same as with pandoc, one fragment at a time."""
+        texts: set[str] = set()
+        for name in glob.glob("tests/data/*.json"):
+            with open(name) as f:
+                collect_strings(json.load(f), texts)
+        native = {}
+        for text in sorted(texts):
+            latex = html_to_latex(text)
+            if latex is not None:
+                native[text] = latex
+        self.assertGreater(len(native), len(texts) / 2)
+        with ThreadPoolExecutor(os.cpu_count()) as pool:
+            expected = pool.map(
+                lambda text: pypandoc.convert_text(
+                    text, "latex", format="html"
+                ),
+                native,
+            )
+        for (text, latex), pandoc in zip(native.items(), expected):
+            with self.subTest(text=text):
+                self.assertEqual(pandoc, latex)
+
+
+def collect_strings(value: Any, texts: set[str]) -> None:
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        for item in value:
+            collect_strings(item, texts)
+    elif isinstance(value, str):
+        texts.add(value)
@@ -0,0 +1,72 @@
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from docsteady.config import Config
+from docsteady.stats import EndpointStats, endpoint, report_path
+from docsteady.utils import pooled_session
+
+
+class TestStats(unittest.TestCase):
+    def test_endpoint(self) -> None:
+        self.assertEqual(
+            "issue/{key}",
+            endpoint(f"{Config.JIRA_API}/issue/LVV-27?&expand=renderedFields"),
+        )
+        self.assertEqual(
+            "testexecutions", endpoint(f"{Config.ATM_API}testexecutions")
+        )
+        self.assertEqual(
+            "testcases/{key}/teststeps",
+            endpoint(f"{Config.ATM_API}testcases/LVV-T101/teststeps"),
+        )
+        self.assertEqual(
+            "people/{accountId}",
+            endpoint(f"{Config.JIRA_API}/people/5b10a2844c20165700ede21f"),
+        )
+        self.assertEqual(
+            "images.example/img/{id}/{file}",
+            endpoint("https://images.example/img/12/plot.png?x=1"),
+        )
+
+    def test_percentiles(self) -> None:
+        stats = EndpointStats()
+        stats.seconds = [float(i) for i in range(1, 101)]
+        self.assertEqual(50, stats.percentile(0.5))
+        self.assertEqual(99, stats.percentile(0.99))
+        self.assertEqual(0, EndpointStats().percentile(0.5))
+
+    def test_requests(self) -> None:
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b"12345"
+        url = f"{Config.JIRA_API}search"
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.multiple(
+            Config,
+            STATS=True,
+            THE_STATS=None,
+            HTTP_CACHE_MODE="refresh",
+            THE_RECORDING=None,
+        ), mock.patch.object(HTTPAdapter, "send", return_value=response):
+            rs = pooled_session()
+            rs.get(url)
+            rs.get(url)
+            assert Config.THE_STATS is not None
+            Config.THE_STATS.write(f"{tmp}/report.json")
+            self.assertIn("search", Config.THE_STATS.table())
+            with open(f"{tmp}/report.json") as f:
+                report = json.load(f)
+        search = report["endpoints"]["search"]
+        self.assertEqual(2, search["requests"])
+        self.assertEqual({"200": 2}, search["statuses"])
+        self.assertEqual(10, search["bytes"])
+
+    def test_report_path(self) -> None:
+        self.assertEqual("out/tpr.stats.json", report_path("out/tpr.tex"))
+        self.assertEqual("docsteady-stats.json", report_path(None))
+        with mock.patch.object(Config, "STATS_REPORT_PATH", "run.json"):
+            self.assertEqual("run.json", report_path(""))
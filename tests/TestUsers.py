@@ -0,0 +1,41 @@
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from docsteady.config import Config
+from docsteady.users import UserDirectory, account_ids, resolve_users
+
+
+class TestUsers(unittest.TestCase):
+    def test_account_ids(self) -> None:
+        loaded: list[dict] = [
+            {"owner": {"accountId": "a"}, "createdBy": "b"},
+            {"executedById": "a", "assignedToId": "None", "name": "c"},
+        ]
+        self.assertEqual(["a", "b"], account_ids(loaded))
+
+    def test_resolve(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = UserDirectory(f"{tmp}/users.json", 60)
+            session = mock.Mock()
+            session.get.return_value.status_code = 200
+            session.get.return_value.json.return_value = {
+                "values": [{"accountId": "a", "displayName": "Ann"}]
+            }
+            with mock.patch.multiple(
+                Config, CACHED_USERS={}, THE_USER_DIRECTORY=directory
+            ):
+                resolve_users(["a", "b", "a"], session)
+                self.assertEqual(
+                    "Ann", Config.CACHED_USERS["a"]["displayName"]
+                )
+                self.assertNotIn("b", Config.CACHED_USERS)
+            session.get.assert_called_once()
+            params = session.get.call_args[1]["params"]
+            self.assertEqual(["a", "b"], params["accountId"])
+            # names are kept between runs until they are too old
+            again = UserDirectory(f"{tmp}/users.json", 60)
+            self.assertEqual({"displayName": "Ann"}, again.get("a"))
+            with mock.patch("time.time", return_value=time.time() + 61):
+                self.assertIsNone(again.get("a"))
@@ -1,5 +1,10 @@
+import os
+import tempfile
 import unittest
+from collections import Counter
+from unittest import mock
 
+import arrow
 from DocsteadyTestUtils import read_test_data
 
 #  getTestCaseData, getTestCases, getVEdata, getVEdetail,
@@ -14,8 +19,26 @@ from jinja2 import (
 from marshmallow import EXCLUDE
 
 from docsteady.config import Config
+from docsteady.executions import ExecutionIndex
 from docsteady.vcd import VerificationE, build_vcd_dict, summary
-from docsteady.ve_baseline import do_ve_model, process_test_cases
+from docsteady.ve_baseline import (
+    Checkpoint,
+    do_ve_model,
+    get_components,
+    get_cycle_summary,
+    get_plan_document,
+    get_result_history,
+    get_tc_versions,
+    get_testcase,
+    index_components,
+    load_snapshot,
+    plan_extraction,
+    process_test_cases,
+    refresh_ves,
+    restore_order,
+    save_snapshot,
+    ve_jql,
+)
 
 
 class TestVCD(unittest.TestCase):
@@ -42,6 +65,343 @@ class TestVCD(unittest.TestCase):
 
         self.assertEqual(len(test_cases), 2)
 
+    def test_ve_fields(self) -> None:
+        """The fields of the VE search are all the VE model needs."""
+        data = read_test_data("VE-LVV-27")
+        names = Config.VE_FIELDS.split(",")
+        projected = dict(data)
+        for part in ("fields", "renderedFields"):
+            projected[part] = {
+                k: v for k, v in data[part].items() if k in names
+            }
+        self.assertEqual(
+            VerificationE(unknown=EXCLUDE).load(data, partial=True),
+            VerificationE(unknown=EXCLUDE).load(projected, partial=True),
+        )
+
+    def test_components(self) -> None:
+        dm = {"components": [{"name": "DM"}], "customfield_15001": None}
+        with mock.patch(
+            "docsteady.ve_baseline.get_rest_session"
+        ) as session, mock.patch.dict(Config.CACHED_COMPONENTS, clear=True):
+            get = session.return_value.get
+            get.return_value.status_code = 200
+            get.return_value.json.return_value = {
+                "issues": [{"key": "LVV-1", "fields": dm}]
+            }
+            index_components(["LVV-1", "LVV-1", "LVV-2"])
+            self.assertEqual(
+                "key in (LVV-1,LVV-2)", get.call_args[1]["params"]["jql"]
+            )
+            self.assertEqual(dm, get_components("LVV-1"))
+            self.assertEqual(1, get.call_count)
+            # not found by the search, searched again then got on its own
+            get.return_value.json.return_value = {"fields": dm}
+            self.assertEqual(dm, get_components("LVV-2"))
+            self.assertEqual(3, get.call_count)
+
+    def test_restore_order(self) -> None:
+        cache = {"old": 0, "c": 3, "a": 1, "b": 2}
+        restore_order(cache, {"old"}, ["a", "old", "b", "a", "c"])
+        self.assertEqual(["old", "a", "b", "c"], list(cache))
+
+    def test_ve_jql(self) -> None:
+        self.assertEqual(
+            'project = LVV and component = "DM" and Sub-Component is null '
+            'and issuetype = Verification and updated >= "2026/10/17 01:00" '
+            "ORDER BY key ASC",
+            ve_jql("DM", "None", "2026/10/17 01:00"),
+        )
+
+    def test_refresh(self) -> None:
+        def ve(key: str, *tcs: str) -> dict:
+            test_cases = [{"key": tc, "status": "old"} for tc in tcs]
+            return {"key": key, "req_id": f"R-{key}", "test_cases": test_cases}
+
+        versions = {"LVV-T1": "a", "LVV-T2": "a", "LVV-T3": "a"}
+        snapshot = {
+            "extracted": "2026-10-17T08:00:00+00:00",
+            "ves": {
+                "LVV-1": ve("LVV-1", "LVV-T1", "LVV-T2"),
+                "LVV-2": ve("LVV-2", "LVV-T3"),
+                "LVV-3": ve("LVV-3"),
+            },
+            "testresults": {"LVV-T1": {"status": "passed"}},
+            "versions": versions,
+        }
+        changed = {"LVV-2": ve("LVV-2", "LVV-T3")}
+        changed["LVV-2"]["test_cases"][0]["status"] = "new"
+        with mock.patch.multiple(
+            "docsteady.ve_baseline",
+            extract_ves=mock.DEFAULT,
+            list_ve_keys=mock.DEFAULT,
+            executed_testcases=mock.DEFAULT,
+            get_testcase=mock.DEFAULT,
+        ) as mocks, mock.patch.multiple(
+            Config, CACHED_TESTCASES={}, CACHED_TESTRES_SUM={}
+        ), mock.patch.dict(
+            Config.CACHED_REQS_FOR_VES, clear=True
+        ):
+
+            def extract(*args: str, **kwargs: str) -> dict:
+                Config.CACHED_TESTCASES["LVV-T3"] = {"status": "new"}
+                return changed
+
+            mocks["extract_ves"].side_effect = extract
+            mocks["list_ve_keys"].return_value = ["LVV-1", "LVV-2"]
+            mocks["executed_testcases"].return_value = {"LVV-T2"}
+            mocks["get_testcase"].return_value = {
+                "key": "LVV-T2",
+                "status": "x",
+            }
+            ves = refresh_ves("DM", "", snapshot, versions)
+            # a day before, in Pacific time
+            self.assertEqual(
+                "2026/10/16 01:00", mocks["extract_ves"].call_args[1]["since"]
+            )
+            self.assertEqual(["LVV-1", "LVV-2"], list(ves))
+            self.assertEqual(
+                ["old", "x"],
+                [tc["status"] for tc in ves["LVV-1"]["test_cases"]],
+            )
+            self.assertEqual("new", ves["LVV-2"]["test_cases"][0]["status"])
+            self.assertEqual(
+                ["LVV-T1", "LVV-T2", "LVV-T3"], list(Config.CACHED_TESTCASES)
+            )
+            self.assertEqual(
+                {"LVV-T1": {"status": "passed"}}, Config.CACHED_TESTRES_SUM
+            )
+            self.assertEqual(
+                {"R-LVV-1": ["LVV-1"], "R-LVV-2": ["LVV-2"]},
+                Config.CACHED_REQS_FOR_VES,
+            )
+
+    def test_refresh_edited(self) -> None:
+        listed = [{"key": "LVV-T1", "name": "old"}, {"key": "LVV-T2"}]
+        with mock.patch(
+            "docsteady.ve_baseline.get_zephyr_api"
+        ) as zapi, mock.patch("builtins.print"):
+            get_test_cases = zapi.return_value.test_cases.get_test_cases
+            get_test_cases.side_effect = lambda **kwargs: iter(listed)
+            versions = get_tc_versions()
+            listed[0] = {"key": "LVV-T1", "name": "new"}
+            edited = get_tc_versions()
+        self.assertEqual(
+            {"projectKey": "LVV", "maxResults": 1000},
+            get_test_cases.call_args[1],
+        )
+        self.assertEqual(versions["LVV-T2"], edited["LVV-T2"])
+        self.assertNotEqual(versions["LVV-T1"], edited["LVV-T1"])
+        snapshot = {
+            "extracted": "2026-10-17T08:00:00+00:00",
+            "ves": {
+                "LVV-1": {
+                    "key": "LVV-1",
+                    "req_id": "R-LVV-1",
+                    "test_cases": [
+                        {"key": "LVV-T1", "name": "old"},
+                        {"key": "LVV-T2"},
+                    ],
+                }
+            },
+            "testresults": {},
+            "versions": versions,
+        }
+        with mock.patch.multiple(
+            "docsteady.ve_baseline",
+            extract_ves=mock.DEFAULT,
+            list_ve_keys=mock.DEFAULT,
+            executed_testcases=mock.DEFAULT,
+            get_testcase=mock.DEFAULT,
+        ) as mocks, mock.patch.multiple(
+            Config, CACHED_TESTCASES={}, CACHED_TESTRES_SUM={}
+        ), mock.patch.dict(
+            Config.CACHED_REQS_FOR_VES, clear=True
+        ), mock.patch(
+            "builtins.print"
+        ):
+            mocks["extract_ves"].return_value = {}
+            mocks["list_ve_keys"].return_value = ["LVV-1"]
+            # edited in Zephyr but not executed since
+            mocks["executed_testcases"].return_value = set()
+            mocks["get_testcase"].return_value = {
+                "key": "LVV-T1",
+                "name": "new",
+            }
+            ves = refresh_ves("DM", "", snapshot, edited)
+            mocks["get_testcase"].assert_called_once_with("LVV-T1")
+            self.assertEqual(
+                ["new", None],
+                [tc.get("name") for tc in ves["LVV-1"]["test_cases"]],
+            )
+
+    def test_snapshot_age(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp, mock.patch(
+            "builtins.print"
+        ):
+            path = f"{tmp}/ve-snapshot.json"
+            now = arrow.utcnow()
+            save_snapshot(path, now, now.isoformat(), {}, {})
+            self.assertIsNotNone(load_snapshot(path))
+            # refreshed every day but last built from scratch long ago
+            built = now.shift(seconds=-Config.VE_SNAPSHOT_MAX_AGE - 1)
+            save_snapshot(path, now, built.isoformat(), {}, {})
+            self.assertIsNone(load_snapshot(path))
+
+    def test_cycle_summary(self) -> None:
+        cycle = read_test_data("TestCycle-LVV-R181")
+        pointer = {"self": f"{Config.ATM_API}testcycles/27531072", "id": 1}
+        with mock.patch(
+            "docsteady.ve_baseline.get_via_zephyr", return_value=cycle
+        ) as get, mock.patch(
+            "docsteady.ve_baseline.get_zephyr_api"
+        ) as zapi, mock.patch.multiple(
+            Config, CACHED_CYCLES={}, CACHED_PLAN_DOCUMENTS={}
+        ):
+            plans = zapi.return_value.test_plans
+            plans.get_test_plan.return_value = {
+                "customFields": {"Document ID": "DMTR-231"}
+            }
+            for _ in range(3):
+                summary = get_cycle_summary(pointer)
+                document = get_plan_document(summary["test_plans"][0])
+            self.assertEqual(
+                {"key": "LVV-R181", "test_plans": [796396]}, summary
+            )
+            self.assertEqual("DMTR-231", document)
+            get.assert_called_once_with(pointer["self"])
+            plans.get_test_plan.assert_called_once_with(796396)
+
+    def test_plan_extraction(self) -> None:
+        def execution(id: int, tc: str, cycle: int) -> dict:
+            return {
+                "id": id,
+                "testCase": {"self": f"{Config.ATM_API}testcases/{tc}"},
+                "testCycle": {"self": f"testcycles/{cycle}", "id": cycle},
+                "actualEndDate": f"2024-01-0{id}T00:00:00Z",
+            }
+
+        index = ExecutionIndex(
+            "LVV",
+            executions=[
+                execution(1, "LVV-T1", 10),
+                execution(2, "LVV-T2", 10),
+                execution(3, "LVV-T3", 11),
+            ],
+        )
+        links = {"LVV-1": ["LVV-T1", "LVV-T2"], "LVV-2": ["LVV-T2", "LVV-T3"]}
+        with mock.patch.multiple(
+            "docsteady.ve_baseline",
+            get_testcases_ve=mock.DEFAULT,
+            get_testcase=mock.DEFAULT,
+            get_via_zephyr=mock.DEFAULT,
+            get_zephyr_api=mock.DEFAULT,
+        ) as mocks, mock.patch.multiple(
+            Config,
+            THE_EXECUTION_INDEX=index,
+            CACHED_VE_TESTCASES={},
+            CACHED_TESTCASES={"LVV-T3": {"key": "LVV-T3"}},
+            CACHED_CYCLES={},
+            CACHED_PLAN_DOCUMENTS={},
+        ):
+            mocks["get_testcases_ve"].side_effect = links.get
+            mocks["get_testcase"].side_effect = lambda key: {"key": key}
+            mocks["get_via_zephyr"].side_effect = lambda url: {
+                "key": url,
+                "links": {"testPlans": [{"testPlanId": 7}]},
+            }
+            plans = mocks["get_zephyr_api"].return_value.test_plans
+            plans.get_test_plan.return_value = {}
+            sizes = plan_extraction(["LVV-1", "LVV-2", "LVV-1"])
+            self.assertEqual(
+                {
+                    "VEs": 2,
+                    "VEs new": 2,
+                    "executions": 3,
+                    "executions new": 0,
+                    "cycles": 2,
+                    "cycles new": 2,
+                    "plans": 1,
+                    "plans new": 1,
+                    "test cases": 3,
+                    "test cases new": 2,
+                },
+                sizes,
+            )
+            self.assertEqual(2, mocks["get_via_zephyr"].call_count)
+            plans.get_test_plan.assert_called_once_with("7")
+            self.assertEqual(
+                ["LVV-T1", "LVV-T2"],
+                [c[0][0] for c in mocks["get_testcase"].call_args_list],
+            )
+
+    def test_checkpoint(self) -> None:
+        ves: list[dict] = [
+            {"key": "LVV-1", "req_id": "R-1", "test_cases": [{"key": "T1"}]},
+            {"key": "LVV-2", "req_id": "R-1", "test_cases": []},
+        ]
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.multiple(
+            Config,
+            CACHED_TESTCASES={},
+            CACHED_TESTRES_SUM={"T1": {"status": "passed"}},
+            CACHED_REQS_FOR_VES={},
+        ):
+            path = os.path.join(tmp, "ve-checkpoint.jsonl")
+            checkpoint = Checkpoint(path)
+            self.assertEqual({}, checkpoint.done)
+            for ve in ves:
+                checkpoint.record(ve)
+            with open(path, "a") as f:
+                f.write('0123 {"ve": {"key": "LVV-3"}')  # cut short
+            Config.CACHED_TESTRES_SUM.clear()
+            resumed = Checkpoint(path, resume=True)
+            self.assertEqual(["LVV-1", "LVV-2"], list(resumed.done))
+            self.assertEqual(ves[0], resumed.restore("LVV-1"))
+            self.assertEqual({"T1": {"key": "T1"}}, Config.CACHED_TESTCASES)
+            self.assertEqual(
+                {"T1": {"status": "passed"}}, Config.CACHED_TESTRES_SUM
+            )
+            self.assertEqual({"R-1": ["LVV-1"]}, Config.CACHED_REQS_FOR_VES)
+            resumed.remove()
+            self.assertFalse(os.path.exists(path))
+            # without resume the journal of an earlier run is not reused
+            checkpoint = Checkpoint(path)
+            checkpoint.record(ves[0])
+            self.assertEqual({}, Checkpoint(path).done)
+            self.assertFalse(os.path.exists(path))
+
+    def test_last_result(self) -> None:
+        execution = {
+            "key": "LVV-E1",
+            "testExecutionStatus": "Pass",
+            "actualEndDate": "2024-06-01T10:00:00Z",
+            "executionDate": "2023-01-01T10:00:00Z",
+            "testCycle": "None",
+        }
+        with mock.patch.multiple(
+            "docsteady.ve_baseline",
+            get_zephyr_api=mock.DEFAULT,
+            TestCase=mock.DEFAULT,
+            get_latest_execution=mock.DEFAULT,
+            get_status_history=mock.DEFAULT,
+        ) as mocks, mock.patch.object(Config, "CACHED_TESTRES_SUM", {}):
+            mocks["TestCase"].return_value.load.return_value = {}
+            mocks["get_latest_execution"].return_value = execution
+            mocks["get_status_history"].return_value = Counter(
+                {"Pass": 1, "Fail": 2, "In Progress": 1, "Not Executed": 1}
+            )
+            tc = get_testcase("LVV-T1")
+            history = get_result_history("LVV-T1")
+        assert tc is not None
+        result = tc["lastR"]
+        self.assertEqual("passed", result["status"])
+        # the date the execution was chosen by
+        self.assertEqual("2024-06-01", result["exdate"])
+        self.assertEqual("", result["TPR"])
+        # the results dumped with the model keep their fields
+        self.assertEqual({"key", "status", "exdate", "TPR"}, set(result))
+        self.assertEqual({"passed": 1, "failed": 2, "notexec": 2}, history)
+
     def test_ve_LVV_27(self) -> None:
         key = "LVV-27"
         # getVEdetail(key)
@@ -0,0 +1,17 @@
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from docsteady.config import Config
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator:
+    """Keep the caches of each test in its own temporary directory, never
+    in the cache of the user running the tests."""
+    monkeypatch.setattr(Config, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(Config, "THE_CONVERSION_CACHE", None)
+    monkeypatch.setattr(Config, "THE_USER_DIRECTORY", None)
+    monkeypatch.setattr(Config, "THE_HTTP_CACHE", None)
+    yield tmp_path / "cache"
@@ -1,15 +1,71 @@
+import glob
+import json
+import os
+import re
 import typing
-from unittest import TestCase
+from collections import Counter
+from unittest import TestCase, mock
+from urllib.parse import urljoin, urlparse
 
+import pypandoc
 from bs4 import BeautifulSoup
 from DocsteadyTestUtils import read_test_data
 
 # from DocsteadyTestUtils import getTplanData,
 from marshmallow import EXCLUDE
+from requests.adapters import HTTPAdapter
+from zephyr import ZephyrScale
 
+from docsteady.cache import Cache
 from docsteady.config import Config
+from docsteady.spec import issue_links, prefetch_issues
 from docsteady.tplan import TestPlan
-from docsteady.utils import download_and_rewrite_images, fix_json
+from docsteady.utils import (
+    fix_json,
+    get_tc_executions,
+    get_value,
+    pooled_session,
+    postprocess_latex,
+    preprocess_html,
+    warm_pointers,
+    zephyr_requests_session,
+)
+
+
+def html_strings(data: typing.Any) -> typing.Iterator[str]:
+    if isinstance(data, str):
+        if "<" in data:
+            yield data
+    elif isinstance(data, dict):
+        for value in data.values():
+            yield from html_strings(value)
+    elif isinstance(data, list):
+        for value in data:
+            yield from html_strings(value)
+
+
+@typing.no_type_check
+def soup_rewrite_images(value: str) -> str:
+    """The BeautifulSoup image rewrite preprocess_html replaced, without
+    downloads, and reading UTF-8 as such where it guessed."""
+    soup = BeautifulSoup(
+        value.encode("utf-8"), "html.parser", from_encoding="utf-8"
+    )
+    rest_location = urljoin(Config.JIRA_INSTANCE, "rest")
+    for img in soup.find_all("img"):
+        img_width = re.sub("[^0-9]", "", img.get("style", "150"))
+        url_path = urlparse(urljoin(rest_location, img["src"])).path[1:]
+        img_name = os.path.basename(url_path).replace(".", "_")
+        if (
+            img.previous_element is not None
+            and img.previous_element.name != "br"
+        ):
+            img.insert_before(soup.new_tag("br"))
+        img["style"] = ""
+        img["width"] = f"{img_width}px"
+        img["display"] = "block"
+        img["src"] = Config.IMAGE_FOLDER + img_name
+    return str(soup)
 
 
 class TestHtmlPandocField(TestCase):
@@ -26,10 +82,146 @@ class TestHtmlPandocField(TestCase):
         The result should look like the following:
         <br>&nbsp;<img src="../rest/tests/1.0/attachment/image/244"
         style="width: 300px;" class="fr-fic fr-fil fr-dii"><br>"""
-        value = download_and_rewrite_images(has_json_text)
+        value = preprocess_html(has_json_text)
         soup = BeautifulSoup(value.encode("utf-8"), "html.parser")
         self.assertEqual(soup.find("img")["src"], "jira_imgs/244")
 
+    def test_golden(self) -> None:
+        """pandoc makes the same LaTeX of all the HTML in the test data
+        after preprocess_html as after the BeautifulSoup rewrite."""
+        texts: dict[str, None] = {}
+        for path in sorted(glob.glob("tests/data/*.json")):
+            with open(path) as f:
+                texts.update(dict.fromkeys(html_strings(json.load(f))))
+        self.assertGreater(len(texts), 200)
+        separator = "\n<hr/>\n"
+        with mock.patch.object(Config, "DOWNLOAD_IMAGES", False):
+            new = separator.join(preprocess_html(text) for text in texts)
+        old = separator.join(soup_rewrite_images(text) for text in texts)
+        self.assertEqual(
+            pypandoc.convert_text(old, "latex", format="html"),
+            pypandoc.convert_text(new, "latex", format="html"),
+        )
+
+    def test_preprocess(self) -> None:
+        self.assertEqual("a &lt; b", preprocess_html("a &lt; b"))
+        # Word soft line breaks are vertical tabs, not allowed in XML
+        self.assertEqual("a b<p>x</p>", preprocess_html("a\x0bb<p>x</p>"))
+        self.assertEqual(
+            "<h2>Scope</h2>\n x &lt;y&gt; \n<strong>Other</strong>\n",
+            preprocess_html(
+                "<strong>Scope</strong> x &lt;y&gt; <strong>Other</strong>",
+                ["scope"],
+            ),
+        )
+        self.assertEqual(
+            " see \\citeds{LDM-503} \\url{https://x.org/LDM-503}",
+            postprocess_latex(
+                "see LDM-503 \\url{https://x.org/LDM-503}", cite=True
+            ),
+        )
+
+
+class TestSessions(TestCase):
+    def test_pooled_session(self) -> None:
+        rs = pooled_session({"accept": "application/json"})
+        adapter = rs.get_adapter(Config.JIRA_INSTANCE)
+        assert isinstance(adapter, HTTPAdapter)
+        self.assertEqual(
+            Config.HTTP_POOL_SIZE,
+            adapter.poolmanager.connection_pool_kw["maxsize"],
+        )
+        self.assertEqual(Config.HTTP_RETRIES, adapter.max_retries.total)
+        self.assertNotIn("Connection", rs.headers)
+
+    def test_zephyr_paging(self) -> None:
+        """Following the next pages leaves the shared session alone."""
+
+        class Session:
+            base_url = Config.ATM_API
+
+            def __init__(self) -> None:
+                self.urls: list[str] = []
+
+            def get(self, url: str, params: dict) -> dict:
+                self.urls.append(self.base_url + url)
+                last = len(self.urls) == 2
+                return {"values": [{"id": 1}], "isLast": last, "next": "n"}
+
+        session = Session()
+        with mock.patch("docsteady.utils.get_zephyr_api") as zapi:
+            zapi.return_value.session = session
+            self.assertEqual(2, len(get_tc_executions({"testCase": "T1"})))
+        self.assertEqual(
+            [f"{Config.ATM_API}testexecutions", "n"], session.urls
+        )
+        self.assertEqual(Config.ATM_API, session.base_url)
+
+    def test_zephyr_requests_session(self) -> None:
+        zephyr = ZephyrScale(base_url=Config.ATM_API, token="t")
+        rs = zephyr_requests_session(zephyr)
+        self.assertIs(zephyr.api.session._session, rs)
+        del zephyr.api.session._session
+        with self.assertLogs(level="WARN"):
+            self.assertIsNone(zephyr_requests_session(zephyr))
+
+
+class TestPrefetch(TestCase):
+    def test_prefetch_issues(self) -> None:
+        testcase = read_test_data("TestCase-LVV-T101")
+        target = testcase["links"]["issues"][0]["target"]
+        found = {"key": "LVV-9", "id": "305177", "fields": {"summary": "s"}}
+        cache: dict = {}
+        with mock.patch("docsteady.spec.get_rest_session") as session:
+            get = session.return_value.get
+            get.return_value.status_code = 200
+            get.return_value.json.return_value = {"issues": [found]}
+            with mock.patch.dict(Config.CACHED_POINTERS):
+                prefetch_issues(issue_links([testcase]), cache)
+                self.assertEqual("LVV-9", Config.CACHED_POINTERS[target])
+                # cached issues are not searched for again
+                prefetch_issues(issue_links([testcase]), cache)
+        self.assertEqual(["LVV-9"], list(cache))
+        self.assertEqual("s", cache["LVV-9"]["summary"].strip())
+        get.assert_called_once()
+        self.assertEqual(
+            "issue in (305177)", get.call_args[1]["params"]["jql"]
+        )
+
+
+class TestPointers(TestCase):
+    def test_warm_pointers(self) -> None:
+        pages: dict[str, list[dict]] = {
+            "statuses": [
+                {"values": [{"id": 1, "name": "Approved"}], "isLast": False},
+                {"values": [{"id": 2, "name": "Draft"}], "isLast": True},
+            ],
+            "projects": [{"values": [{"id": 7, "key": "LVV"}]}],
+        }
+
+        def get(table: str, params: dict) -> dict:
+            if table not in pages:
+                return {"values": []}
+            return pages[table][params["startAt"]]
+
+        pointers = Cache("pointers")
+        with mock.patch(
+            "docsteady.utils.get_zephyr_api"
+        ) as api, mock.patch.multiple(
+            Config,
+            CACHED_POINTERS=pointers,
+            POINTERS_WARMED=False,
+        ):
+            api.return_value.session.get.side_effect = get
+            warm_pointers()
+            self.assertEqual(
+                "Draft", get_value({"self": f"{Config.ATM_API}statuses/2"})
+            )
+            self.assertEqual(
+                "LVV", get_value({"self": f"{Config.ATM_API}projects/7"})
+            )
+            self.assertEqual(Counter(hit=2), pointers.stats)
+
 
 class TestTplan(TestCase):
     def test_tplan(self) -> None: